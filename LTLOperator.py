@@ -8,15 +8,19 @@ class LTLOperator(tf.keras.layers.Layer):
   Output: The result of applying the filters to the sequence
   """
   def __init__(self, num_variables, num_filters, trace_length,
-               kernel_regularizer=None, metric=True, **kwargs):
+               kernel_regularizer=None, metric=True, scan=False, **kwargs):
     self.num_filters = num_filters
     self.num_variables = num_variables
     self.trace_length = trace_length
     self.kernel_regularizer = tf.keras.regularizers.get(kernel_regularizer)
     self.metric = metric
+    # scan=True runs the time loop as a single compiled reverse scan instead of
+    # unrolling one set of ops per timestep into the graph
+    self.scan = scan
     self.slope = tf.Variable(1.0, trainable=False)
     self.alpha = tf.Variable(0.2, trainable=False)
     super(LTLOperator, self).__init__(**kwargs)
+    self.supports_masking = True
 
   def build(self, input_shape):
     init = tf.keras.initializers.GlorotNormal()
@@ -64,32 +68,49 @@ class LTLOperator(tf.keras.layers.Layer):
       return tf.nn.relu(x)
 
   @tf.function
-  def call(self, traces, training=None):
+  def call(self, traces, training=None, mask=None):
     if training is None:
       training = tf.keras.backend.learning_phase()
     """
     Passes a batch of traces through the LTL Operator
     Input: (batch_size, trace_length, num_variables) tensor containing the traces
+           and an optional (batch_size, trace_length) mask that is False on the
+           padding after the end of each trace
     Output: (batch_size, trace_length, num_filters) tensor containing the output
     """
     results = []
+    # batch size and trace length are read dynamically so a single graph
+    # serves any batch size (and any trace length in scan mode)
+    batch = tf.shape(traces)[0]
 
     curr_time_out = tf.tensordot(traces, self.w_prop, axes=((2), (0)))
     if self.metric:
-        extension = tf.tile(tf.expand_dims(self.init_metric, 0), [traces.shape[0], 1, 1])
+        extension = tf.tile(tf.expand_dims(self.init_metric, 0), [batch, 1, 1])
         traces_extended = tf.concat([traces, extension], axis=1)
-        next_time_out = tf.tensordot(traces_extended, self.w_metric, axes=((2), (0)))
-        next_time_out = next_time_out[:, 1:, :]
+        next_traces = traces_extended[:, 1:, :]
+        if mask is not None:
+            # the step after the last unpadded one sees init_metric, as if
+            # the trace ended there
+            next_mask = tf.concat([mask[:, 1:], tf.zeros_like(mask[:, :1])], axis=1)
+            next_traces = tf.where(tf.expand_dims(next_mask, 2), next_traces,
+                                   tf.broadcast_to(extension, tf.shape(next_traces)))
+        next_time_out = tf.tensordot(next_traces, self.w_metric, axes=((2), (0)))
         combined_out = curr_time_out + next_time_out
     else:
         combined_out = curr_time_out
+    init_run_val = self.activation(tf.tile(self.init_run, [batch, 1]), training)
+    if self.scan:
+      return self.scan_time(combined_out, init_run_val, training, mask)
+    next_run_val = init_run_val
     # Loop through traces starting from last timestep (so we have access to run(i,k+1) at timestep k)
-    next_run_val = self.activation(tf.tile(self.init_run, [traces.shape[0], 1]), training)
     for k in range(traces.shape[1]-1,-1,-1):
       # Grab all run summations for a single timestep
-      curr_run_vals = tf.gather_nd(combined_out, list(zip(range(len(traces)), [k for _ in range(len(traces))])))
+      curr_run_vals = combined_out[:, k, :]
       partial_run = tf.math.multiply(self.relu_scheduled(self.w_qual, training), next_run_val)
       next_run_val = self.activation(partial_run + curr_run_vals + self.bias, training)
+      if mask is not None:
+        # padded steps hold the value past the end of the trace
+        next_run_val = tf.where(tf.expand_dims(mask[:, k], 1), next_run_val, init_run_val)
       results.append(next_run_val)
     # Flipping results lists since we iterate backwards
     results = tf.convert_to_tensor(list(reversed(results)))
@@ -97,5 +118,40 @@ class LTLOperator(tf.keras.layers.Layer):
     results = tf.transpose(results, perm=[1, 0, 2])
     return results
 
+  def scan_time(self, combined_out, init_run_val, training, mask=None):
+    """
+    Same recurrence as the unrolled loop in call, run as a reverse tf.scan over
+    time-major slices so the graph size does not depend on the trace length
+    Input: (batch_size, trace_length, num_filters) tensor of run summations,
+           (batch_size, num_filters) tensor of run values past the last timestep
+           and an optional (batch_size, trace_length) padding mask
+    Output: (batch_size, trace_length, num_filters) tensor containing the output
+    """
+    w_qual = self.relu_scheduled(self.w_qual, training)
+
+    def step(next_run_val, curr_run_vals):
+      partial_run = tf.math.multiply(w_qual, next_run_val)
+      return self.activation(partial_run + curr_run_vals + self.bias, training)
+
+    def masked_step(next_run_val, elems):
+      curr_run_vals, curr_mask = elems
+      # padded steps hold the value past the end of the trace
+      return tf.where(tf.expand_dims(curr_mask, 1),
+                      step(next_run_val, curr_run_vals), init_run_val)
+
+    # (batch_size, trace_length, num_filters) -> (trace_length, batch_size, num_filters)
+    combined_out = tf.transpose(combined_out, perm=[1, 0, 2])
+    # reverse=True walks from the last timestep but keeps outputs in time order
+    if mask is None:
+      results = tf.scan(step, combined_out, initializer=init_run_val, reverse=True)
+    else:
+      results = tf.scan(masked_step, (combined_out, tf.transpose(mask)),
+                        initializer=init_run_val, reverse=True)
+    return tf.transpose(results, perm=[1, 0, 2])
+
+  def compute_mask(self, traces, mask=None):
+    # the padding is the same for every layer of the network
+    return mask
+
   def compute_output_shape(self, input_shape):
     return (input_shape[0], input_shape[1], self.num_filters)
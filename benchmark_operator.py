@@ -0,0 +1,91 @@
+import tensorflow as tf
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Cropping1D, Input, Reshape
+import numpy as np
+import time
+import argparse
+from LTLOperator import LTLOperator
+from packed_data import dataset_exists, load_dataset
+
+batch_size = 100
+num_variables = 3
+
+"""
+Same architecture as models.get_model_two with a configurable trace length
+and time loop mode
+"""
+def build_model(trace_length, scan):
+    model = Sequential()
+    model.add(Input(batch_shape=(batch_size, trace_length, num_variables)))
+    model.add(LTLOperator(num_variables, 5, trace_length, metric=False, scan=scan))
+    model.add(LTLOperator(5, 5, trace_length, metric=False, scan=scan))
+    model.add(LTLOperator(5, 1, trace_length, metric=False, scan=scan))
+    model.add(Cropping1D((0, trace_length-1)))
+    model.add(Reshape((-1,1)))
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=0.005),
+                  loss='binary_crossentropy')
+    return model
+
+"""
+Times the first training step (graph build + tracing) and the mean of the
+following steps for a single model on the given traces
+"""
+def time_model(model, traces, labels, num_steps):
+    start_time = time.time()
+    model.train_on_batch(traces[:batch_size], labels[:batch_size])
+    build_time = time.time() - start_time
+
+    start_time = time.time()
+    for step in range(num_steps):
+        j = (step * batch_size) % (len(traces) - batch_size + 1)
+        model.train_on_batch(traces[j:j+batch_size], labels[j:j+batch_size])
+    step_time = (time.time() - start_time) / num_steps
+    return build_time, step_time
+
+"""
+Checks both modes give the same output for the same weights
+"""
+def max_difference(trace_length, traces):
+    unrolled = build_model(trace_length, scan=False)
+    scanned = build_model(trace_length, scan=True)
+    scanned.set_weights(unrolled.get_weights())
+    out_unrolled = unrolled.predict(traces, batch_size=batch_size, verbose=0)
+    out_scanned = scanned.predict(traces, batch_size=batch_size, verbose=0)
+    return float(np.max(np.abs(out_unrolled - out_scanned)))
+
+def benchmark_lengths(trace_lengths, num_steps):
+    print("Synthetic traces")
+    for trace_length in trace_lengths:
+        traces = np.random.randint(0, 2, (4*batch_size, trace_length, num_variables)).astype(np.float32)
+        labels = np.random.randint(0, 2, (4*batch_size,)).astype(np.float32)
+        for scan in [False, True]:
+            build_time, step_time = time_model(build_model(trace_length, scan), traces, labels, num_steps)
+            tf.keras.backend.clear_session()
+            print(f"length {trace_length} {'scan' if scan else 'unrolled'}: "
+                  f"build {build_time:.3f}s step {1000*step_time:.2f}ms")
+
+def benchmark_data(data_path, num_steps):
+    print(f"Datasets in {data_path}")
+    for n in range(2, 16):
+        if not dataset_exists(data_path, n, 0):
+            continue
+        traces, labels = load_dataset(data_path, n, 0)
+        trace_length = traces.shape[1]
+        times = []
+        for scan in [False, True]:
+            times.append(time_model(build_model(trace_length, scan), traces, labels, num_steps))
+            tf.keras.backend.clear_session()
+        diff = max_difference(trace_length, traces)
+        tf.keras.backend.clear_session()
+        print(f"size {n}: unrolled build {times[0][0]:.3f}s step {1000*times[0][1]:.2f}ms, "
+              f"scan build {times[1][0]:.3f}s step {1000*times[1][1]:.2f}ms, "
+              f"max output difference {diff}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark unrolled and scan LTLOperator time loops")
+    parser.add_argument('--data_path',default="data/original",type=str,help="Path to traces")
+    parser.add_argument('--trace_lengths',default="15,50,100,200,400",type=str,help="Comma separated synthetic trace lengths")
+    parser.add_argument('--num_steps',default=20,type=int,help="Timed training steps per model")
+    args = parser.parse_args()
+    benchmark_lengths([int(x) for x in args.trace_lengths.split(",")], args.num_steps)
+    benchmark_data(args.data_path, args.num_steps)
@@ -0,0 +1,162 @@
+from flloat.parser.ltlf import LTLfParser
+from lark.exceptions import LarkError
+import multiprocessing
+import re
+import numpy as np
+import argparse
+import hashlib
+import time
+import os
+from data import generate_cs, rejection_sample
+from dfa import CompiledDFA
+from packed_data import packed_path, append_dataset, dataset_exists
+
+"""
+Builds trace datasets like data/original and data/noisy from formula files.
+Line i of {n}.txt becomes set i of {output_path}/{n}.packed: the characteristic
+sample of the formula topped up with random traces to num_pos positive and
+num_neg negative ones.
+"""
+
+"""
+Converts a formula in Spot syntax (as in formulas/*.txt) to the syntax flloat
+parses: prefix operators need a space before their operand, e.g. "FGb" is
+"F G b"
+"""
+def from_spot_syntax(formula_string):
+    return re.sub(r"(?<![A-Za-z0-9_])([FGX]+)(?=[!(a-z])",
+                  lambda match: " ".join(match.group(1)) + " ", formula_string)
+
+"""
+Canonical string of a formula, so that formulas that only differ in spacing
+or redundant parentheses share one cache entry
+"""
+def canonical(formula_string):
+    return str(LTLfParser()(formula_string))
+
+def cache_file(cache_path, formula_string, lits):
+    key = hashlib.sha1(f"{canonical(formula_string)}|{','.join(lits)}".encode()).hexdigest()
+    return f"{cache_path}/{key}.npz"
+
+"""
+Returns the minimized DFA of a formula, loading it from cache_path if it was
+built before and storing it there otherwise
+"""
+def cached_dfa(cache_path, formula_string, lits):
+    if cache_path is None:
+        return CompiledDFA.from_formula(formula_string, lits)
+    path = cache_file(cache_path, formula_string, lits)
+    if os.path.exists(path):
+        cached = np.load(path)
+        return CompiledDFA(cached["table"], cached["accepting"], int(cached["initial_state"]), lits)
+    dfa = CompiledDFA.from_formula(formula_string, lits)
+    # write then rename, so another worker never reads a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, table=dfa.table, accepting=dfa.accepting, initial_state=dfa.initial_state)
+    os.replace(tmp_path, path)
+    return dfa
+
+"""
+Swaps the labels of round(noise*num_pos) positive and as many negative traces
+and shuffles the set, which is how the noisy datasets were made
+"""
+def add_noise(traces, labels, noise):
+    num_flips = int(round(noise * labels.sum()))
+    pos = np.nonzero(labels)[0]
+    neg = np.nonzero(~labels)[0]
+    flips = np.concatenate([np.random.choice(pos, num_flips, replace=False),
+                            np.random.choice(neg, num_flips, replace=False)])
+    labels = labels.copy()
+    labels[flips] = ~labels[flips]
+    order = np.random.permutation(len(labels))
+    return traces[order], labels[order]
+
+"""
+Generates set i of formula size n. Returns (n, i, traces, labels), with None
+traces if no set could be made for the formula.
+"""
+def build_job(job):
+    n, i, formula_string, lits, trace_length, num_pos, num_neg, noise, cache_path, batch_size, seed = job
+    # seeded per set, so the output does not depend on the order jobs run in
+    np.random.seed([seed, n, i])
+    dfa = cached_dfa(cache_path, formula_string, lits)
+    cs = generate_cs(formula_string, lits, trace_length, dfa=dfa)
+    if cs is None:
+        return n, i, None, None
+    # characteristic sample paths longer than the traces can't be stored
+    cs_pos = [trace for trace in cs[0] if len(trace) == trace_length][:num_pos]
+    cs_neg = [trace for trace in cs[1] if len(trace) == trace_length][:num_neg]
+    sample = rejection_sample(formula_string, lits, trace_length, num_pos - len(cs_pos),
+                              num_neg - len(cs_neg), batch_size=batch_size)
+    if sample is None:
+        return n, i, None, None
+    # same order as data/original: characteristic sample, then random traces
+    traces = np.array(cs_pos + cs_neg + sample[0] + sample[1], dtype=np.bool_)
+    traces = traces.reshape(num_pos + num_neg, trace_length, len(lits))
+    labels = np.array([True]*len(cs_pos) + [False]*len(cs_neg) +
+                      [True]*len(sample[0]) + [False]*len(sample[1]))
+    if noise > 0:
+        traces, labels = add_noise(traces, labels, noise)
+    return n, i, traces, labels
+
+"""
+Builds every set of the formula files on a pool of worker processes. Sets are
+appended to {output_path}/{n}.packed as they finish, and sets already in the
+output are skipped, so an interrupted build can be restarted. Formulas flloat
+can't parse are skipped.
+"""
+def build_datasets(formula_files, output_path, lits, trace_length, num_pos, num_neg, noise,
+                   cache_path, num_workers, batch_size, max_formulas, seed):
+    os.makedirs(output_path, exist_ok=True)
+    if cache_path is not None:
+        os.makedirs(cache_path, exist_ok=True)
+
+    jobs = []
+    parser = LTLfParser()
+    unparsed = 0
+    for formula_file in formula_files:
+        n = int(os.path.splitext(os.path.basename(formula_file))[0])
+        with open(formula_file) as file:
+            formulas = [line.strip() for line in file if line.strip()]
+        for i, formula_string in enumerate(formulas[:max_formulas]):
+            if dataset_exists(output_path, n, i):
+                continue
+            formula_string = from_spot_syntax(formula_string)
+            try:
+                parser(formula_string)
+            except LarkError:
+                print(f"Skipped formula size {n} number {i}: can't parse {formula_string}")
+                unparsed += 1
+                continue
+            jobs.append((n, i, formula_string, lits, trace_length, num_pos, num_neg,
+                         noise, cache_path, batch_size, seed))
+    print(f"{len(jobs)} sets to build, {unparsed} formulas skipped")
+
+    start_time = time.time()
+    with multiprocessing.Pool(num_workers) as pool:
+        for count, (n, i, traces, labels) in enumerate(pool.imap_unordered(build_job, jobs)):
+            if traces is None:
+                print(f"Skipped formula size {n} number {i}")
+                continue
+            # only the parent writes, one record per finished set
+            append_dataset(packed_path(output_path, n), i, traces, labels)
+            print(f"[{count+1}/{len(jobs)} {time.time()-start_time:.0f}s] Built formula size {n} number {i}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds packed trace datasets from formula files")
+    parser.add_argument('--formula_files',required=True,nargs='+',type=str,help="Formula files named {n}.txt, one formula per line")
+    parser.add_argument('--output_path',required=True,type=str,help="Path to write {n}.packed files to")
+    parser.add_argument('--lits',default="a,b,c",type=str,help="Comma separated variables")
+    parser.add_argument('--trace_length',default=15,type=int,help="Length of the traces")
+    parser.add_argument('--num_pos',default=500,type=int,help="Positive traces per set")
+    parser.add_argument('--num_neg',default=500,type=int,help="Negative traces per set")
+    parser.add_argument('--noise',default=0.0,type=float,help="Fraction of labels swapped per class, 0.01 for data/noisy")
+    parser.add_argument('--cache_path',default=None,type=str,help="Path to cache minimized DFAs in")
+    parser.add_argument('--num_workers',default=os.cpu_count(),type=int,help="Number of worker processes")
+    parser.add_argument('--batch_size',default=10000,type=int,help="Traces sampled at a time")
+    parser.add_argument('--max_formulas',default=None,type=int,help="Sets built per formula file")
+    parser.add_argument('--seed',default=0,type=int,help="Random seed")
+    args = parser.parse_args()
+    build_datasets(args.formula_files, args.output_path, args.lits.split(","), args.trace_length,
+                   args.num_pos, args.num_neg, args.noise, args.cache_path, args.num_workers,
+                   args.batch_size, args.max_formulas, args.seed)
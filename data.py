@@ -4,6 +4,9 @@ from collections import deque
 import math
 import random
 from copy import deepcopy
+import numpy as np
+from ltlf_eval import from_flloat, truth
+from dfa import CompiledDFA, edge_to_letter, letter_to_edge
 
 def lexographic(x):
   value = 0
@@ -17,67 +20,63 @@ def generate_edges(lits):
     edges = [{l: p for l, p in zip(lits, pr)} for pr in prod]
     return edges
 
-def generate_cs(formula_string, lits, trace_length):
+def generate_cs(formula_string, lits, trace_length, dfa=None):
   """
   algorithm from https://arxiv.org/pdf/1605.07805.pdf (section 4) or
   https://faculty.ist.psu.edu/vhonavar/Papers/parekh-dfa.pdf
+  Runs on the transition table of a CompiledDFA (built from formula_string
+  unless given), with edges as integer letters.
   """
-  parser = LTLfParser()
-  formula = parser(formula_string)
-  dfa = formula.to_automaton().minimize().complete()
+  if dfa is None:
+    dfa = CompiledDFA.from_formula(formula_string, lits)
+  table = dfa.table
   pos = []
   neg = []
-  edges = generate_edges(lits)
-  edges.sort(key=lexographic)
-
-  sink_states = set()
-  for state in dfa.states:
-      is_sink = True
-      for edge in edges:
-        if dfa.get_successor(state, edge) != state:
-            is_sink = False
-            break
-      if is_sink:
-          sink_states.add(state)
+  edges = [edge_to_letter(edge, lits) for edge in generate_edges(lits)]
+  edges.sort(key=lambda letter: lexographic(letter_to_edge(letter, lits)))
+  sink_states = set(np.nonzero(dfa.sink)[0].tolist())
+  accepting_states = set(np.nonzero(dfa.accepting)[0].tolist())
+  initial_state = dfa.initial_state
 
   # 1) bfs to find shortest path to each node, S_p(L)
   parent = dict()
   visited = set()
-  queue = deque([dfa.initial_state])
-  while len(queue) is not 0:
+  queue = deque([initial_state])
+  while len(queue) != 0:
     state = queue.popleft()
     for edge in edges:
-      if dfa.get_successor(state, edge) not in visited:
-        visited.add(dfa.get_successor(state, edge))
-        queue.append(dfa.get_successor(state, edge))
-        parent[dfa.get_successor(state, edge)] = (state, edge)
+      succ = int(table[state, edge])
+      if succ not in visited:
+        visited.add(succ)
+        queue.append(succ)
+        parent[succ] = (state, edge)
   shortest_paths = []
-  for state in dfa.states:
-    if state in parent and state != dfa.initial_state:
+  for state in range(dfa.num_states):
+    if state in parent and state != initial_state:
       path = []
       par, inc_edge = parent[state]
       path.append(inc_edge)
-      while par is not dfa.initial_state:
+      while par != initial_state:
         par, inc_edge = parent[par]
         path.append(inc_edge)
       path.reverse()
       shortest_paths.append((state, path))
 
   # add the empty path to S_p(L) since it is the shortest path to initial state
-  shortest_paths.append((dfa.initial_state, []))
+  shortest_paths.append((initial_state, []))
 
   # 2) extend each shortest path with every possible edge, N(L)
   extended_paths = []
   for state, short_path in shortest_paths:
     for edge in edges:
-      extended_paths.append((dfa.get_successor(state, edge), short_path + [edge]))
+      extended_paths.append((int(table[state, edge]), short_path + [edge]))
 
   # add the empty path to N(L)
-  extended_paths.append((dfa.initial_state, []))
+  extended_paths.append((initial_state, []))
 
   # 3) finish the extended paths using bfs to get to a sink, add these to the corresponding set
   for ext_state, ext_path in extended_paths:
-    if ext_state in dfa.accepting_states:
+    if ext_state in accepting_states:
       pos.append(ext_path)
     elif ext_state in sink_states:
       neg.append(ext_path)
@@ -86,59 +85,44 @@ def generate_cs(formula_string, lits, trace_length):
       visited = set()
       queue = deque([ext_state])
       acc_state = None
-      while len(queue) is not 0:
+      while len(queue) != 0:
         state = queue.popleft()
         for edge in edges:
-          if dfa.get_successor(state, edge) not in visited:
-            visited.add(dfa.get_successor(state, edge))
-            queue.append(dfa.get_successor(state, edge))
-            parent[dfa.get_successor(state, edge)] = (state, edge)
-          if dfa.get_successor(state, edge) in dfa.accepting_states:
-            acc_state = dfa.get_successor(state, edge)
+          succ = int(table[state, edge])
+          if succ not in visited:
+            visited.add(succ)
+            queue.append(succ)
+            parent[succ] = (state, edge)
+          if succ in accepting_states:
+            acc_state = succ
             break
       path = []
       par, inc_edge = parent[acc_state]
       path.append(inc_edge)
-      while par is not ext_state:
+      while par != ext_state:
         par, inc_edge = parent[par]
         path.append(inc_edge)
       path.reverse()
       pos.append(ext_path + path)
 
   # 4) find shortest distinguishing suffix for each pair of strings, one from S_p(q) and one from N(L)
+  # the paths lead to short_state and ext_state, so the suffix only depends on
+  # that pair of states and is read off the DFA's pair distance table
   for short_state, short_path in shortest_paths:
     for ext_state, ext_path in extended_paths:
-      if short_state is not ext_state:
-        done = False
-        # first try appending the empty string
-        if short_state in dfa.accepting_states and ext_state not in dfa.accepting_states:
-            pos.append(short_path)
-            neg.append(ext_path)
-            done = True
-        elif ext_state in dfa.accepting_states and short_state not in dfa.accepting_states:
-            pos.append(ext_path)
-            neg.append(short_path)
-            done = True
-
-        length = 1
-        while not done:
-          suffixes = [list(prod) for prod in product(edges, repeat=length)]
-          len_suff = len(suffixes)
-          for k, s in enumerate(suffixes):
-            trace_short = short_path + s
-            trace_ext = ext_path + s
-            if formula.truth(trace_short, 0) != formula.truth(trace_ext, 0):
-              if formula.truth(trace_short, 0):
-                pos.append(short_path + s)
-                neg.append(ext_path + s)
-                done = True
-                break
-              if formula.truth(trace_ext, 0):
-                pos.append(ext_path + s)
-                neg.append(short_path + s)
-                done = True
-                break
-          length += 1
+      if short_state != ext_state:
+        s = dfa.distinguishing_suffix(short_state, ext_state, edges)
+        if s is None:
+          continue
+        if dfa.accepting[dfa.run_word(short_state, s)]:
+          pos.append(short_path + s)
+          neg.append(ext_path + s)
+        else:
+          pos.append(ext_path + s)
+          neg.append(short_path + s)
+
+  pos = [[letter_to_edge(letter, lits) for letter in path] for path in pos]
+  neg = [[letter_to_edge(letter, lits) for letter in path] for path in neg]
 
   # remove duplicates
   pos = set(list(map(lambda x: tuple([tuple([t[l] for l in lits]) for t in x]), pos)))
@@ -171,7 +155,9 @@ def generate_cs(formula_string, lits, trace_length):
 
   return new_pos, new_neg
 
-def rejection_sample(formula_string, lits, trace_length, num_pos, num_neg):
+def rejection_sample(formula_string, lits, trace_length, num_pos, num_neg, batch_size=None):
+    if batch_size is not None:
+        return rejection_sample_batched(formula_string, lits, trace_length, num_pos, num_neg, batch_size)
     parser = LTLfParser()
     formula = parser(formula_string)
     pos = []
@@ -237,3 +223,51 @@ def rejection_sample(formula_string, lits, trace_length, num_pos, num_neg):
     neg = [[[t[l] for l in lits] for t in trace] for trace in neg]
 
     return pos, neg
+
+def rejection_sample_batched(formula_string, lits, trace_length, num_pos, num_neg, batch_size):
+    """
+    Same sampling as rejection_sample, but draws and labels batch_size random
+    (or perturbed) traces at a time with the vectorized evaluator
+    """
+    parser = LTLfParser()
+    formula = from_flloat(parser(formula_string), lits)
+    pos = np.zeros((0, trace_length, len(lits)), dtype=np.bool_)
+    neg = np.zeros((0, trace_length, len(lits)), dtype=np.bool_)
+
+    def add(traces):
+        nonlocal pos, neg
+        labels = truth(formula, traces)
+        pos = np.concatenate([pos, traces[labels][:num_pos - len(pos)]])
+        neg = np.concatenate([neg, traces[~labels][:num_neg - len(neg)]])
+
+    def perturb_traces(traces, num):
+        perturbed = traces[np.random.randint(len(traces), size=num)]
+        steps = np.random.randint(trace_length, size=num)
+        ls = np.random.randint(len(lits), size=num)
+        perturbed[np.arange(num), steps, ls] = ~perturbed[np.arange(num), steps, ls]
+        return perturbed
+
+    counter = 0
+    while len(pos) < num_pos or len(neg) < num_neg:
+        add(np.random.randint(2, size=(batch_size, trace_length, len(lits))).astype(np.bool_))
+        counter += batch_size
+        if counter > 250000 and (len(pos) < num_pos or len(neg) < num_neg):
+            sub_counter = 0
+            print("Trying perturbed traces")
+            if len(pos) == 0 or len(neg) == 0:
+                print("Giving up - empty trace set")
+                return None
+            while len(pos) < num_pos or len(neg) < num_neg:
+                candidates = []
+                if len(pos) < num_pos:
+                    candidates.append(perturb_traces(pos, batch_size))
+                if len(neg) < num_neg:
+                    candidates.append(perturb_traces(neg, batch_size))
+                add(np.concatenate(candidates))
+                sub_counter += batch_size
+                if sub_counter > 250000:
+                    print("Giving up - perturb failed")
+                    return None
+            break
+
+    return pos.tolist(), neg.tolist()
@@ -0,0 +1,147 @@
+from flloat.parser.ltlf import LTLfParser
+from itertools import product
+from collections import deque
+import numpy as np
+
+"""
+Letters are integers with bit i set when lits[i] is true, so a letter indexes
+a column of the transition table directly
+"""
+def letter_to_edge(letter, lits):
+    return {l: bool(letter >> i & 1) for i, l in enumerate(lits)}
+
+def edge_to_letter(edge, lits):
+    return sum(1 << i for i, l in enumerate(lits) if edge[l])
+
+def letter_to_step(letter, lits):
+    return [bool(letter >> i & 1) for i in range(len(lits))]
+
+class CompiledDFA:
+  """
+  Complete DFA over the letters of lits as an integer
+  (num_states, 2^len(lits)) transition table. States are 0..num_states-1.
+  """
+  def __init__(self, table, accepting, initial_state, lits):
+    self.table = np.asarray(table, dtype=np.int64)
+    self.accepting = np.asarray(accepting, dtype=np.bool_)
+    self.initial_state = initial_state
+    self.lits = list(lits)
+    self.num_states, self.num_letters = self.table.shape
+    # sinks only loop back to themselves
+    self.sink = np.all(self.table == np.arange(self.num_states)[:, None], axis=1)
+    self.dist_to_accept = self.distances(self.accepting)
+
+  @classmethod
+  def from_automaton(cls, dfa, lits):
+    """
+    Builds the table from a complete pythomata/flloat DFA, calling
+    get_successor once per (state, letter)
+    """
+    states = sorted(dfa.states)
+    index = {state: i for i, state in enumerate(states)}
+    table = [[index[dfa.get_successor(state, letter_to_edge(letter, lits))]
+              for letter in range(2**len(lits))] for state in states]
+    accepting = [state in dfa.accepting_states for state in states]
+    return cls(table, accepting, index[dfa.initial_state], lits)
+
+  @classmethod
+  def from_formula(cls, formula_string, lits):
+    formula = LTLfParser()(formula_string)
+    return cls.from_automaton(formula.to_automaton().minimize().complete(), lits)
+
+  def distances(self, targets):
+    """
+    Length of the shortest word leading from each state into targets
+    (-1 if targets can't be reached), by a backward BFS
+    """
+    dist = np.where(targets, 0, -1)
+    frontier = np.asarray(targets, dtype=np.bool_)
+    d = 0
+    while frontier.any():
+      d += 1
+      # states with a successor in the frontier that have no distance yet
+      reaches = np.any(frontier[self.table], axis=1) & (dist < 0)
+      dist[reaches] = d
+      frontier = reaches
+    return dist
+
+  def pair_distances(self):
+    """
+    (num_states, num_states) table with the length of the shortest suffix
+    accepted from exactly one of the two states (-1 if they are equivalent).
+    Computed by a BFS over the pair-product automaton, backwards from the
+    pairs that disagree on acceptance, and cached.
+    """
+    if getattr(self, '_pair_dist', None) is None:
+      dist = np.where(self.accepting[:, None] != self.accepting[None, :], 0, -1)
+      # successor pairs of every (p, q) for every letter, (states, states, letters)
+      succ_p = np.broadcast_to(self.table[:, None, :], (self.num_states, self.num_states, self.num_letters))
+      succ_q = np.broadcast_to(self.table[None, :, :], (self.num_states, self.num_states, self.num_letters))
+      d = 0
+      while True:
+        reaches = np.any(dist[succ_p, succ_q] == d, axis=2) & (dist < 0)
+        if not reaches.any():
+          break
+        d += 1
+        dist[reaches] = d
+      self._pair_dist = dist
+    return self._pair_dist
+
+  def distinguishing_suffix(self, p, q, order=None):
+    """
+    Returns a shortest list of letters accepted from exactly one of p and q
+    (None if they are equivalent). Among those, the first one in the
+    lexicographic order given by the letter list order.
+    """
+    dist = self.pair_distances()
+    if dist[p, q] < 0:
+      return None
+    if order is None:
+      order = range(self.num_letters)
+    suffix = []
+    for remaining in range(dist[p, q] - 1, -1, -1):
+      for letter in order:
+        if dist[self.table[p, letter], self.table[q, letter]] == remaining:
+          break
+      suffix.append(letter)
+      p, q = self.table[p, letter], self.table[q, letter]
+    return suffix
+
+  def letters(self, traces):
+    """
+    Converts (batch, time, vars) Boolean traces to (batch, time) letters
+    """
+    traces = np.asarray(traces).astype(np.int64)
+    return traces @ (1 << np.arange(len(self.lits)))
+
+  def step(self, state, letter):
+    return self.table[state, letter]
+
+  def run_word(self, state, letters):
+    for letter in letters:
+      state = self.table[state, letter]
+    return state
+
+  def final_states(self, traces, lengths=None, start=None):
+    """
+    Returns the (batch,) states reached after reading each trace (only the
+    first lengths[b] steps of trace b if lengths is given)
+    """
+    letters = self.letters(traces)
+    batch, trace_length = letters.shape
+    states = np.full(batch, self.initial_state if start is None else start, dtype=np.int64)
+    for t in range(trace_length):
+      next_states = self.table[states, letters[:, t]]
+      if lengths is not None:
+        next_states = np.where(t < np.asarray(lengths), next_states, states)
+      states = next_states
+    return states
+
+  def run(self, traces, lengths=None):
+    """
+    Returns a (batch,) array that is True for accepted traces
+    """
+    return self.accepting[self.final_states(traces, lengths)]
+
+  def accuracy(self, traces, labels, lengths=None):
+    return float(np.mean(self.run(traces, lengths) == np.asarray(labels).astype(np.bool_)))
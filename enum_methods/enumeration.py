@@ -0,0 +1,173 @@
+import time
+
+"""
+Bottom-up enumeration of LTLf formulas by size, over the operators of the SAT
+encodings (AND, OR, UNTIL, RELEASE, EVENTUALLY, ALWAYS, literals and with
+metric=True NEXT, WNEXT). Sizes count nodes as the SAT encodings do, with a
+negated literal one node.
+
+A formula is represented by its truth at every (trace, position) pair, packed
+into one Python int: the traces are laid end to end, bit start[e]+t holding
+the truth at timestep t of trace e. Formulas with the same bits agree on every
+trace, and so do all formulas built from them, so only the first (smallest)
+formula of every bit-vector is kept (observational equivalence).
+"""
+
+class Traces:
+  """
+  The bit layout of a set of traces and the masks the operators need
+  """
+  def __init__(self, traces, num_vars):
+    self.num_vars = num_vars
+    self.starts = []
+    self.lits = [0]*num_vars
+    offset = 0
+    last = 0
+    for trace in traces:
+      self.starts.append(offset)
+      for t, step in enumerate(trace):
+        for i in range(num_vars):
+          if step[i]:
+            self.lits[i] |= 1 << (offset + t)
+      offset += len(trace)
+      last |= 1 << (offset - 1)
+    self.size = offset
+    self.all = (1 << offset) - 1
+    self.last = last
+    # within[s] - the positions t with t+s in the same trace
+    max_length = max([len(trace) for trace in traces], default=1)
+    self.within = [self.all & ~self.last_of(s) for s in range(max_length)]
+
+  def last_of(self, s):
+    # the positions at most s-1 steps before the end of their trace
+    mask = 0
+    for start, end in zip(self.starts, self.starts[1:] + [self.size]):
+      for p in range(max(start, end-s), end):
+        mask |= 1 << p
+    return mask
+
+  def reach(self, s):
+    return self.within[s] if s < len(self.within) else 0
+
+  def next(self, f):
+    return (f >> 1) & self.reach(1)
+
+  def wnext(self, f):
+    return ((f >> 1) & self.reach(1)) | self.last
+
+  def until(self, a, b):
+    # doubling: after a step of span s, result holds where b holds within s
+    # steps with a up to it, passable where a holds for the next s steps
+    result, passable = b, a
+    s = 1
+    while s < len(self.within):
+      result |= passable & (result >> s) & self.within[s]
+      passable &= (passable >> s) & self.within[s]
+      s *= 2
+    return result
+
+  def release(self, a, b):
+    return self.all & ~self.until(self.all & ~a, self.all & ~b)
+
+  def eventually(self, f):
+    return self.until(self.all, f)
+
+  def always(self, f):
+    return self.all & ~self.eventually(self.all & ~f)
+
+def popcount(x):
+  return bin(x).count("1")
+
+class Enumerator:
+  """
+  Enumerates formulas on positive and negative traces. check() scores the
+  formulas (see add) by the truth at the first position of each trace.
+  """
+  def __init__(self, lits, pos_traces, neg_traces, metric=False):
+    self.lits = lits
+    self.layout = Traces(pos_traces + neg_traces, len(lits))
+    self.pos_roots = sum(1 << start for start in self.layout.starts[:len(pos_traces)])
+    self.neg_roots = sum(1 << start for start in self.layout.starts[len(pos_traces):])
+    self.num_examples = len(pos_traces) + len(neg_traces)
+    self.metric = metric
+    # by_size[n] - (bits, formula) of the kept formulas of size n
+    self.by_size = [[]]
+    self.seen = set()
+    self.best = None
+    self.best_correct = -1
+
+  def add(self, bits, formula, n):
+    """
+    Keeps a formula of size n unless an equivalent one was kept, and returns
+    True if it classifies every example right
+    """
+    if bits in self.seen:
+      return False
+    self.seen.add(bits)
+    self.by_size[n].append((bits, formula))
+    correct = popcount(bits & self.pos_roots) + popcount(~bits & self.neg_roots)
+    if correct > self.best_correct:
+      self.best = formula
+      self.best_correct = correct
+    return correct == self.num_examples
+
+  def accuracy(self):
+    return self.best_correct / max(self.num_examples, 1)
+
+  def grow(self, n, deadline=None):
+    """
+    Enumerates the formulas of size n. Returns a consistent formula if one is
+    found, None otherwise. Stops early (without a formula) at deadline.
+    """
+    layout = self.layout
+    self.by_size.append([])
+    if n == 1:
+      for i in range(len(self.lits)):
+        for bits, formula in [(layout.lits[i], ("LIT", i)), (layout.all & ~layout.lits[i], ("NOT", ("LIT", i)))]:
+          if self.add(bits, formula, 1):
+            return formula
+      return None
+
+    unary = [("EVENTUALLY", layout.eventually), ("ALWAYS", layout.always)]
+    if self.metric:
+      unary += [("NEXT", layout.next), ("WNEXT", layout.wnext)]
+    for bits, formula in self.by_size[n-1]:
+      for op, apply in unary:
+        if self.add(apply(bits), (op, formula), n):
+          return (op, formula)
+    if deadline is not None and time.time() > deadline:
+      return None
+
+    for left_size in range(1, n-1):
+      right_size = n-1-left_size
+      for a, (a_bits, a_formula) in enumerate(self.by_size[left_size]):
+        if deadline is not None and time.time() > deadline:
+          return None
+        for b, (b_bits, b_formula) in enumerate(self.by_size[right_size]):
+          # AND and OR are commutative, one order is enough
+          if left_size < right_size or (left_size == right_size and a <= b):
+            for op, bits in [("AND", a_bits & b_bits), ("OR", a_bits | b_bits)]:
+              if self.add(bits, (op, a_formula, b_formula), n):
+                return (op, a_formula, b_formula)
+          for op, bits in [("UNTIL", layout.until(a_bits, b_bits)), ("RELEASE", layout.release(a_bits, b_bits))]:
+            if self.add(bits, (op, a_formula, b_formula), n):
+              return (op, a_formula, b_formula)
+    return None
+
+"""
+Enumerates formulas of growing size until one classifies every example right
+or max_time seconds pass. Returns the size reached, the consistent formula
+(or else the best-accuracy one found) and its accuracy.
+"""
+def learn(lits, pos_traces, neg_traces, metric=False, max_time=None, max_size=None):
+  deadline = None if max_time is None else time.time() + max_time
+  enumerator = Enumerator(lits, pos_traces, neg_traces, metric)
+  n = 1
+  while max_size is None or n <= max_size:
+    formula = enumerator.grow(n, deadline)
+    if formula is not None:
+      return n, formula, 1.0
+    if deadline is not None and time.time() > deadline:
+      break
+    n += 1
+  return n, enumerator.best, enumerator.accuracy()
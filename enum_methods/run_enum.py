@@ -0,0 +1,60 @@
+import os
+import pickle
+import numpy as np
+from enumeration import learn
+import time
+import argparse
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from packed_data import dataset_exists, load_dataset
+from ltlf_eval import formula_string
+
+MAX_TIME = 300
+
+"""
+Runs the enumerative learner on a single formula for MAX_TIME seconds. The
+result has the format of run_sat.py, so print_results.py --sat reads it. A
+run that finds no consistent formula in time is recorded as TIMED OUT like
+in run_sat.py, or with best=True as the best-accuracy formula it found.
+"""
+def single_formula_run_enum(positive_traces,negative_traces,lits,formula_length,metric=False,best=False):
+    start_time = time.time()
+    size, formula, accuracy = learn(lits, positive_traces, negative_traces, metric, MAX_TIME)
+    total_time = (time.time()-start_time)
+    if accuracy < 1.0 and total_time >= MAX_TIME and not best:
+        return (formula_length,MAX_TIME,"TIMED OUT",0.0)
+    return formula_length, min(total_time, MAX_TIME), formula_string(formula, lits), accuracy
+
+def run_enum(data_file,output_file,num_formulas,lits,metric=False,best=False):
+    for n in range(1, 16):
+        count = 0
+        for j in range(100):
+            # some formulas may be skipped so read in as many files
+            # as it takes to get to num_formulas (up to 100)
+            if count >= num_formulas:
+                break
+            if dataset_exists(data_file, n, j):
+                count += 1
+                traces,labels = load_dataset(data_file, n, j)
+                positive_traces = []
+                negative_traces = []
+                for trace, label in zip(traces,labels):
+                    if label == 1.0:
+                        positive_traces.append(trace.astype(np.bool_).tolist())
+                    else:
+                        negative_traces.append(trace.astype(np.bool_).tolist())
+                res = single_formula_run_enum(positive_traces,negative_traces,lits,n,metric,best)
+                print(f"Size {n} number {count}: {res}")
+                with open(output_file,"ab+") as file:
+                    pickle.dump(res,file)
+
+if __name__ == "__main__":
+    lits = ["a","b","c"]
+    num_formulas = 50
+    parser = argparse.ArgumentParser(description="Inputs for LTL test")
+    parser.add_argument('--data_path',required=True,type=str,help="Path to traces for testing")
+    parser.add_argument('--output_file',required=True,type=str,help="File to write outputs to using pickle")
+    parser.add_argument('--metric',action='store_true',help="Also enumerate NEXT and WNEXT")
+    parser.add_argument('--best',action='store_true',help="Record the best-accuracy formula instead of TIMED OUT")
+    args = parser.parse_args()
+    run_enum(args.data_path,args.output_file,num_formulas,lits,args.metric,args.best)
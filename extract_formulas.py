@@ -1,6 +1,8 @@
 import argparse
 from translation import translate
 from models import get_model_zero, get_model_one, get_model_two
+from LTLOperator import LTLOperator
+from packed_data import load_dataset
 import spot
 import os
 import pickle
@@ -35,13 +37,12 @@ def extract_formulas(models, data_path, train_path, output_path):
                 checkpoint_path = f"{train_path}/{name}/{n}/cp-{i}.ckpt"
                 if not os.path.exists(f"{train_path}/{name}/{n}/cp-{i}.ckpt.index"):
                     continue
-                with open(f"{data_path}/{n}/train-{i}", "rb") as file:
-                    train_traces, train_labels = pickle.loads(file.read())
+                train_traces, train_labels = load_dataset(data_path, n, i)
 
                 count += 1
                 model.load_weights(checkpoint_path).expect_partial()
                 _, acc, precision, recall = model.evaluate(train_traces, train_labels, batch_size=batch_size)
-                layer_weights = [l.get_weights() for l in model.layers[:-2]]
+                layer_weights = [l.get_weights() for l in model.layers if isinstance(l, LTLOperator)]
                 f = translate(layer_weights, lits, metric=False)
                 formulas_n.append((acc, f))
                 print(f"Translated formula size {n} number {count}")
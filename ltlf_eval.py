@@ -0,0 +1,151 @@
+import numpy as np
+from flloat.ltlf import (LTLfAtomic, LTLfTrue, LTLfFalse, LTLfNot, LTLfAnd, LTLfOr,
+                         LTLfImplies, LTLfEquivalence, LTLfNext, LTLfWeakNext,
+                         LTLfUntil, LTLfRelease, LTLfEventually, LTLfAlways,
+                         LTLfLast, LTLfEnd)
+
+"""
+Vectorized LTLf semantics over batches of traces.
+
+Formulas are compiled to nested tuples, e.g. ("UNTIL", ("LIT", 0), ("NOT", ("LIT", 1))):
+  ("TRUE",) ("FALSE",) ("LIT", variable index) ("NOT", f) ("AND", f, g, ...)
+  ("OR", f, g, ...) ("NEXT", f) ("WNEXT", f) ("UNTIL", f, g) ("RELEASE", f, g)
+  ("EVENTUALLY", f) ("ALWAYS", f)
+and evaluated on a (batch, time, vars) Boolean array with the same finite
+trace semantics as flloat's formula.truth. Traces can be shorter than the
+array, with their lengths given separately.
+"""
+
+"""
+Compiles a formula parsed with flloat's LTLfParser into a tuple formula.
+lits gives the variable order of the traces.
+"""
+def from_flloat(formula, lits):
+    if isinstance(formula, LTLfTrue):
+        return ("TRUE",)
+    if isinstance(formula, LTLfFalse):
+        return ("FALSE",)
+    if isinstance(formula, LTLfAtomic):
+        return ("LIT", lits.index(formula.s))
+    if isinstance(formula, LTLfNot):
+        return ("NOT", from_flloat(formula.f, lits))
+    if isinstance(formula, LTLfNext):
+        return ("NEXT", from_flloat(formula.f, lits))
+    if isinstance(formula, LTLfWeakNext):
+        return ("WNEXT", from_flloat(formula.f, lits))
+    if isinstance(formula, LTLfEventually):
+        return ("EVENTUALLY", from_flloat(formula.f, lits))
+    if isinstance(formula, LTLfAlways):
+        return ("ALWAYS", from_flloat(formula.f, lits))
+    if isinstance(formula, LTLfAnd):
+        return ("AND",) + tuple(from_flloat(f, lits) for f in formula.formulas)
+    if isinstance(formula, LTLfOr):
+        return ("OR",) + tuple(from_flloat(f, lits) for f in formula.formulas)
+    if isinstance(formula, (LTLfUntil, LTLfRelease)):
+        # n-ary until/release associate to the right
+        op = "UNTIL" if isinstance(formula, LTLfUntil) else "RELEASE"
+        fs = [from_flloat(f, lits) for f in formula.formulas]
+        compiled = fs[-1]
+        for f in reversed(fs[:-1]):
+            compiled = (op, f, compiled)
+        return compiled
+    if isinstance(formula, (LTLfImplies, LTLfEquivalence, LTLfLast, LTLfEnd)):
+        return from_flloat(formula.to_nnf(), lits)
+    assert False, f"unknown flloat formula {formula}"
+
+"""
+Returns a (batch, time) array that is True where the formula holds at that
+position. Entries past the end of a trace are unspecified.
+"""
+def evaluate(formula, traces, lengths=None):
+    traces = np.asarray(traces).astype(np.bool_)
+    batch, trace_length, _ = traces.shape
+    if lengths is None:
+        lengths = np.full(batch, trace_length)
+    positions = np.arange(trace_length)
+    # (batch, time) masks for positions inside the trace and positions with a successor
+    inside = positions[None, :] < np.asarray(lengths)[:, None]
+    has_next = positions[None, :] + 1 < np.asarray(lengths)[:, None]
+
+    def shift(values, fill):
+        # value at t+1, fill at the last position of the array
+        return np.concatenate([values[:, 1:], np.full((batch, 1), fill)], axis=1)
+
+    def suffix_or(values):
+        values = values & inside
+        return np.logical_or.accumulate(values[:, ::-1], axis=1)[:, ::-1]
+
+    def suffix_and(values):
+        values = values | ~inside
+        return np.logical_and.accumulate(values[:, ::-1], axis=1)[:, ::-1]
+
+    def rec(f):
+        op = f[0]
+        if op == "TRUE":
+            return np.ones((batch, trace_length), dtype=np.bool_)
+        if op == "FALSE":
+            return np.zeros((batch, trace_length), dtype=np.bool_)
+        if op == "LIT":
+            return traces[:, :, f[1]]
+        if op == "NOT":
+            return ~rec(f[1])
+        if op == "AND":
+            return np.logical_and.reduce([rec(g) for g in f[1:]])
+        if op == "OR":
+            return np.logical_or.reduce([rec(g) for g in f[1:]])
+        if op == "NEXT":
+            return shift(rec(f[1]), False) & has_next
+        if op == "WNEXT":
+            return shift(rec(f[1]), True) | ~has_next
+        if op == "EVENTUALLY":
+            return suffix_or(rec(f[1]))
+        if op == "ALWAYS":
+            return suffix_and(rec(f[1]))
+        if op == "UNTIL":
+            left = rec(f[1])
+            right = rec(f[2]) & inside
+            result = np.empty((batch, trace_length), dtype=np.bool_)
+            after = np.zeros(batch, dtype=np.bool_)
+            for t in range(trace_length - 1, -1, -1):
+                after = right[:, t] | (left[:, t] & after)
+                result[:, t] = after
+            return result
+        if op == "RELEASE":
+            left = rec(f[1])
+            right = rec(f[2]) | ~inside
+            result = np.empty((batch, trace_length), dtype=np.bool_)
+            after = np.ones(batch, dtype=np.bool_)
+            for t in range(trace_length - 1, -1, -1):
+                after = right[:, t] & (left[:, t] | after)
+                result[:, t] = after
+            return result
+        assert False, f"unknown operator {op}"
+
+    return rec(formula)
+
+"""
+Returns a (batch,) array with the truth of the formula on each trace, i.e.
+formula.truth(trace, 0) for non-empty traces
+"""
+def truth(formula, traces, lengths=None):
+    return evaluate(formula, traces, lengths)[:, 0]
+
+"""
+Prints a tuple formula in the syntax Spot and flloat parse (weak next is
+flloat's WX). lits gives the names of the variables.
+"""
+def formula_string(formula, lits):
+    op = formula[0]
+    if op == "TRUE":
+        return "true"
+    if op == "FALSE":
+        return "false"
+    if op == "LIT":
+        return lits[formula[1]]
+    if op == "NOT":
+        return "!" + formula_string(formula[1], lits)
+    symbols = {"NEXT": "X", "WNEXT": "WX", "EVENTUALLY": "F", "ALWAYS": "G",
+               "AND": "&", "OR": "|", "UNTIL": "U", "RELEASE": "R"}
+    if len(formula) == 2:
+        return f"{symbols[op]}({formula_string(formula[1], lits)})"
+    return f" {symbols[op]} ".join(f"({formula_string(f, lits)})" for f in formula[1:])
@@ -1,35 +1,130 @@
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Cropping1D, Input, Reshape
+from tensorflow.keras.layers import Input, Lambda, Masking, Reshape
+import numpy as np
 from LTLOperator import LTLOperator
 
 trace_length = 15
 num_variables = 3
-batch_size = 100
+# value marking the timesteps after the end of a shorter trace in a batch
+pad_value = -1.0
 
-def get_model_zero():
-    model = Sequential()
-    model.add(Input(batch_shape=(batch_size, trace_length, num_variables)))
-    model.add(LTLOperator(num_variables, 1, trace_length, metric=False))
-    model.add(Cropping1D((0, trace_length-1)))
+"""
+Pads a list of traces of possibly different lengths with pad_value so they
+can share one batch of a model built with masked=True
+"""
+def pad_traces(traces, length=None):
+    if length is None:
+        length = max(len(trace) for trace in traces)
+    padded = np.full((len(traces), length, num_variables), pad_value, dtype=np.float32)
+    for i, trace in enumerate(traces):
+        padded[i, :len(trace)] = trace
+    return padded
+
+"""
+Cuts stutter from traces for the non-metric networks, which have no next
+operator and so give a trace the same (discretized) output with a step
+repeated or not. With tail_only=True only the repeats of the last step are
+cut (e.g. the padding of characteristic samples), otherwise every repeat.
+"""
+def collapse_stutter(traces, tail_only=True):
+    collapsed = []
+    for trace in traces:
+        trace = np.asarray(trace)
+        keep = np.ones(len(trace), dtype=np.bool_)
+        keep[1:] = np.any(trace[1:] != trace[:-1], axis=1)
+        if tail_only:
+            keep = np.arange(len(trace)) <= np.nonzero(keep)[0][-1]
+        collapsed.append(trace[keep])
+    return collapsed
+
+"""
+Batches traces of different lengths so that the traces of a batch have the
+same length, and a batch only runs as many timesteps as its traces have.
+Traces are reshuffled every epoch before being grouped.
+"""
+def length_batches(traces, labels, batch_size):
+    lengths = np.array([len(trace) for trace in traces])
+    data = tf.data.Dataset.from_tensor_slices((pad_traces(traces), np.asarray(labels), lengths))
+    data = data.shuffle(len(traces), reshuffle_each_iteration=True)
+    data = data.apply(tf.data.experimental.group_by_window(
+        key_func=lambda trace, label, length: tf.cast(length, tf.int64),
+        reduce_func=lambda length, window: window.batch(batch_size),
+        window_size=batch_size))
+    return data.map(lambda trace, label, length: (trace[:, :length[0]], label))
+
+class LTLModel(Sequential):
+    """
+    Sequential model that also measures the discretized (hard threshold)
+    accuracy inside each training step while check_discrete is set (every
+    check_freq epochs, see DiscreteAcc), so early stopping does not need a
+    separate predict over the training set
+    """
+    def __init__(self, layers=None, name=None):
+        super(LTLModel, self).__init__(layers=layers, name=name)
+        self.check_discrete = tf.Variable(True, trainable=False)
+        self.discrete_acc = tf.keras.metrics.Mean(name='discrete_acc')
+
+    @property
+    def metrics(self):
+        # listed here so fit resets it at the start of every epoch
+        return super(LTLModel, self).metrics + [self.discrete_acc]
+
+    def train_step(self, data):
+        traces, labels = data
+        with tf.GradientTape() as tape:
+            output = self(traces, training=True)
+            loss = self.compiled_loss(labels, output, regularization_losses=self.losses)
+        grads = tape.gradient(loss, self.trainable_variables)
+        self.optimizer.apply_gradients(zip(grads, self.trainable_variables))
+        self.compiled_metrics.update_state(labels, output)
+
+        def update_discrete_acc():
+            # hard threshold pass on the same batch with the updated weights
+            discrete = tf.reshape(self(traces, training=False), [-1])
+            correct = tf.cast(discrete == tf.cast(tf.reshape(labels, [-1]), discrete.dtype), tf.float32)
+            self.discrete_acc.update_state(correct)
+            return tf.constant(True)
+        tf.cond(self.check_discrete, update_discrete_acc, lambda: tf.constant(False))
+        return {m.name: m.result() for m in self.metrics}
+
+"""
+Batch size and trace length are left dynamic. With masked=True, timesteps
+equal to pad_value are treated as past the end of the trace.
+"""
+def input_layers(model, masked):
+    model.add(Input(shape=(None, num_variables)))
+    if masked:
+        model.add(Masking(mask_value=pad_value))
+
+"""
+Keeps the output at the first timestep, i.e. whether the whole trace satisfies
+the formula
+"""
+def output_layers(model):
+    model.add(Lambda(lambda x: x[:, :1, :]))
     model.add(Reshape((-1,1)))
+
+def get_model_zero(masked=False):
+    model = LTLModel()
+    input_layers(model, masked)
+    model.add(LTLOperator(num_variables, 1, trace_length, metric=False, scan=True))
+    output_layers(model)
     return model
 
-def get_model_one():
-    model = Sequential()
-    model.add(Input(batch_shape=(batch_size, trace_length, num_variables)))
-    model.add(LTLOperator(num_variables, 3, trace_length, metric=False))
-    model.add(LTLOperator(3, 1, trace_length, metric=False))
-    model.add(Cropping1D((0, trace_length-1)))
-    model.add(Reshape((-1,1)))
+def get_model_one(masked=False):
+    model = LTLModel()
+    input_layers(model, masked)
+    model.add(LTLOperator(num_variables, 3, trace_length, metric=False, scan=True))
+    model.add(LTLOperator(3, 1, trace_length, metric=False, scan=True))
+    output_layers(model)
     return model
 
-def get_model_two():
-    model = Sequential()
-    model.add(Input(batch_shape=(batch_size, trace_length, num_variables)))
-    model.add(LTLOperator(num_variables, 5, trace_length, metric=False))
-    model.add(LTLOperator(5, 5, trace_length, metric=False))
-    model.add(LTLOperator(5, 1, trace_length, metric=False))
-    model.add(Cropping1D((0, trace_length-1)))
-    model.add(Reshape((-1,1)))
+def get_model_two(masked=False):
+    model = LTLModel()
+    input_layers(model, masked)
+    model.add(LTLOperator(num_variables, 5, trace_length, metric=False, scan=True))
+    model.add(LTLOperator(5, 5, trace_length, metric=False, scan=True))
+    model.add(LTLOperator(5, 1, trace_length, metric=False, scan=True))
+    output_layers(model)
     return model
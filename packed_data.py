@@ -0,0 +1,144 @@
+import numpy as np
+import argparse
+import pickle
+import os
+
+"""
+Packed trace datasets. All train-i sets of one formula size n are stored in a
+single file {data_path}/{n}.packed:
+
+  MAGIC, then one record per set:
+    header: int64 (i, num_traces, trace_length, num_variables)
+    traces: one bit per (timestep, variable), num_traces rows of
+            ceil(trace_length*num_variables/8) bytes
+    labels: one bit per trace, ceil(num_traces/8) bytes
+    zero padding to a multiple of 8 bytes
+
+Files are read through a memory map, so opening a size only parses the
+record headers and the packed bits of a set are views into the map.
+"""
+
+MAGIC = b"LTLPACK1"
+header_size = 32
+open_files = dict()
+
+def packed_path(data_path, n):
+    return f"{data_path}/{n}.packed"
+
+def padding(size):
+    return -size % 8
+
+class PackedTraces:
+  """
+  Memory-mapped reader for one {n}.packed file
+  """
+  def __init__(self, path):
+    self.data = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(self.data[:len(MAGIC)]) != MAGIC:
+      raise ValueError(f"{path} is not a packed trace file")
+    self.index = dict()
+    offset = len(MAGIC)
+    while offset < len(self.data):
+      i, num_traces, trace_length, num_variables = self.data[offset:offset+header_size].view('<i8')
+      trace_bytes = num_traces * -(-(trace_length*num_variables) // 8)
+      label_bytes = -(-num_traces // 8)
+      self.index[int(i)] = (offset + header_size, int(num_traces), int(trace_length), int(num_variables))
+      offset += header_size + trace_bytes + label_bytes + padding(trace_bytes + label_bytes)
+
+  def indices(self):
+    return sorted(self.index)
+
+  def packed(self, i):
+    """
+    Returns views of the packed (num_traces, bytes_per_trace) trace bits and
+    the label bits of set i, without copying
+    """
+    offset, num_traces, trace_length, num_variables = self.index[i]
+    row_bytes = -(-(trace_length*num_variables) // 8)
+    traces = self.data[offset:offset + num_traces*row_bytes].reshape(num_traces, row_bytes)
+    offset += num_traces*row_bytes
+    labels = self.data[offset:offset + -(-num_traces // 8)]
+    return traces, labels
+
+  def load(self, i):
+    """
+    Returns set i as (num_traces, trace_length, num_variables) float32 traces
+    and (num_traces,) float32 labels, like the pickled datasets
+    """
+    _, num_traces, trace_length, num_variables = self.index[i]
+    traces, labels = self.packed(i)
+    traces = np.unpackbits(traces, axis=1, count=trace_length*num_variables)
+    traces = traces.reshape(num_traces, trace_length, num_variables).astype(np.float32)
+    labels = np.unpackbits(labels, count=num_traces).astype(np.float32)
+    return traces, labels
+
+"""
+Appends set i to a packed file, creating it if needed
+"""
+def append_dataset(path, i, traces, labels):
+    traces = np.asarray(traces).astype(np.bool_)
+    labels = np.asarray(labels).astype(np.bool_)
+    num_traces, trace_length, num_variables = traces.shape
+    trace_bits = np.packbits(traces.reshape(num_traces, -1), axis=1)
+    label_bits = np.packbits(labels)
+    with open(path, "ab") as file:
+        if file.tell() == 0:
+            file.write(MAGIC)
+        file.write(np.array([i, num_traces, trace_length, num_variables], dtype='<i8').tobytes())
+        file.write(trace_bits.tobytes())
+        file.write(label_bits.tobytes())
+        file.write(bytes(padding(trace_bits.size + label_bits.size)))
+    open_files.pop(path, None)
+
+def packed_file(data_path, n):
+    path = packed_path(data_path, n)
+    if path not in open_files:
+        open_files[path] = PackedTraces(path) if os.path.exists(path) else None
+    return open_files[path]
+
+"""
+Checks whether set i of formula size n exists, packed or pickled
+"""
+def dataset_exists(data_path, n, i):
+    packed = packed_file(data_path, n)
+    if packed is not None:
+        return i in packed.index
+    return os.path.exists(f"{data_path}/{n}/train-{i}")
+
+"""
+Loads set i of formula size n as numpy (traces, labels), from
+{data_path}/{n}.packed if it exists and otherwise from the pickled
+{data_path}/{n}/train-{i} (which needs TensorFlow to unpickle)
+"""
+def load_dataset(data_path, n, i):
+    packed = packed_file(data_path, n)
+    if packed is not None:
+        return packed.load(i)
+    with open(f"{data_path}/{n}/train-{i}", "rb") as file:
+        traces, labels = pickle.loads(file.read())
+    return np.asarray(traces), np.asarray(labels)
+
+"""
+Converts every pickled {data_path}/{n}/train-i into {output_path}/{n}.packed
+"""
+def convert(data_path, output_path):
+    os.makedirs(output_path, exist_ok=True)
+    for n in sorted(os.listdir(data_path)):
+        if not os.path.isdir(f"{data_path}/{n}"):
+            continue
+        path = packed_path(output_path, n)
+        if os.path.exists(path):
+            os.remove(path)
+        files = [f for f in os.listdir(f"{data_path}/{n}") if f.startswith("train-")]
+        for i in sorted(int(f[len("train-"):]) for f in files):
+            with open(f"{data_path}/{n}/train-{i}", "rb") as file:
+                traces, labels = pickle.loads(file.read())
+            append_dataset(path, i, traces, labels)
+        print(f"Packed {len(files)} sets of size {n} into {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts pickled trace sets to the packed format")
+    parser.add_argument('--data_path',required=True,type=str,help="Path to pickled traces")
+    parser.add_argument('--output_path',required=True,type=str,help="Path to write packed files to")
+    args = parser.parse_args()
+    convert(args.data_path, args.output_path)
@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+import argparse
+import numpy as np
+from encoding import create_sat, create_pmaxsat, encode, CNFTarget
+from z3 import unknown
+from external import solve_external
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from packed_data import load_dataset
+
+"""
+Splits the first num_traces/2 positive and negative traces of a dataset into
+the Boolean lists the encodings take
+"""
+def split_traces(traces, labels, num_traces):
+    positive_traces = [trace.astype(np.bool_).tolist() for trace in traces[labels == 1.0][:num_traces//2]]
+    negative_traces = [trace.astype(np.bool_).tolist() for trace in traces[labels != 1.0][:num_traces//2]]
+    return positive_traces, negative_traces
+
+"""
+Times building (and optionally solving) the SAT and PMAX-SAT encodings of
+formula size N for growing numbers of traces, with trie=True sharing the RUN
+variables of equal trace suffixes. Every encoding is built once per set of
+encoding.prunings in prune_sets (sets joined with +, "none" for no pruning),
+and solved by each of solvers: z3 or an external solver (see external.py),
+which gets the encoding as clauses. A solve that runs out of timeout seconds
+is reported as >timeout, and any other unknown result as unknown.
+"""
+def benchmark_encoding(data_path, n, i, sizes, trace_counts, trace_length, lits, solve, trie=False, prune_sets=["none"], solvers=["z3"], timeout=None):
+    traces, labels = load_dataset(data_path, n, i)
+    print(f"{'N':>3} {'traces':>6} {'method':>8} {'prune':>18} {'solver':>10} {'build (s)':>10} {'assertions':>10} {'solve (s)':>10}")
+    for N in sizes:
+        for num_traces in trace_counts:
+            positive_traces, negative_traces = split_traces(traces, labels, num_traces)
+            for name, create in [("sat", create_sat), ("pmaxsat", create_pmaxsat)]:
+                for prune_set in prune_sets:
+                    prune = [] if prune_set == "none" else prune_set.split("+")
+                    for solver in solvers:
+                        start_time = time.time()
+                        if solver == "z3":
+                            optimizer = create(N, trace_length, lits, positive_traces, negative_traces, trie=trie, prune=prune)
+                            num_assertions = len(optimizer.assertions())
+                        else:
+                            target = encode(CNFTarget(soft=name == "pmaxsat"), N, trace_length, lits, positive_traces, negative_traces, trie=trie, prune=prune)
+                            num_assertions = len(target.goal) + len(target.roots)
+                        build_time = time.time() - start_time
+                        solve_time = ""
+                        if solve:
+                            start_time = time.time()
+                            if solver == "z3":
+                                # interrupted rather than given z3's timeout
+                                # parameter, which changes how z3 solves
+                                timer = threading.Timer(timeout, optimizer.ctx.interrupt) if timeout is not None else None
+                                if timer is not None:
+                                    timer.start()
+                                timed_out = optimizer.check() == unknown
+                                if timer is not None:
+                                    timer.cancel()
+                            else:
+                                timed_out = solve_external(target, solver, timeout)[0] == "unknown"
+                            solve_time = f"{time.time() - start_time:.2f}"
+                            if timed_out:
+                                solve_time = "unknown" if timeout is None else f">{timeout:g}"
+                        print(f"{N:>3} {num_traces:>6} {name:>8} {prune_set:>18} {solver:>10} {build_time:>10.2f} {num_assertions:>10} {solve_time:>10}")
+
+if __name__ == "__main__":
+    trace_length = 15
+    lits = ["a","b","c"]
+    parser = argparse.ArgumentParser(description="Benchmarks building the SAT encodings")
+    parser.add_argument('--data_path',required=True,type=str,help="Path to traces")
+    parser.add_argument('--n',default=5,type=int,help="Formula size of the dataset to take traces from")
+    parser.add_argument('--i',default=0,type=int,help="Dataset number")
+    parser.add_argument('--sizes',default=[2,5,10],nargs='+',type=int,help="Formula sizes N to encode")
+    parser.add_argument('--num_traces',default=[100,500,1000],nargs='+',type=int,help="Numbers of traces to encode")
+    parser.add_argument('--solve',action='store_true',help="Also time solving each encoding")
+    parser.add_argument('--trie',action='store_true',help="Share RUN variables between equal trace suffixes")
+    parser.add_argument('--prune_sets',default=["none"],nargs='+',type=str,help="Sets of pruning constraints to compare, e.g. none order patterns amo order+patterns+amo")
+    parser.add_argument('--solvers',default=["z3"],nargs='+',type=str,help="Solvers to compare: z3, pysat, pysat:<name> or solver commands")
+    parser.add_argument('--timeout',default=None,type=float,help="Seconds each solve may take")
+    args = parser.parse_args()
+    benchmark_encoding(args.data_path, args.n, args.i, args.sizes, args.num_traces, trace_length, lits, args.solve, args.trie, args.prune_sets, args.solvers, args.timeout)
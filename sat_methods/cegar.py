@@ -0,0 +1,83 @@
+import os
+import sys
+import numpy as np
+from z3 import unsat
+from encoding import encode, SolverTarget, OptimizeTarget
+from utils import decode_formula, pad_traces
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ltlf_eval import truth
+
+"""
+Counterexample-guided trace subsetting. Only a subset of the traces is
+encoded: a formula is found for the subset, evaluated on all traces, and the
+traces it gets wrong are added to the subset until it gets every trace
+outside the subset right.
+
+For SAT this finds the same smallest size as encoding every trace, since a
+size that is unsatisfiable on a subset is unsatisfiable on all traces. For
+PMAX-SAT the subset keeps its weights, and the formula found is optimal for
+all traces once it makes no mistakes outside the subset: any other formula
+can do no better on the subset and no better than all right on the rest.
+"""
+
+# traces per class encoded from the start, the first ones of a dataset
+# (where the characteristic sample is)
+SEED_SIZE = 10
+# counterexamples per class added per round
+BATCH_SIZE = 10
+
+class CEGAR:
+  """
+  The traces of one dataset and the subset of them encoded so far, kept
+  across formula sizes. With soft=True the subset is solved with PMAX-SAT.
+  """
+  def __init__(self, trace_length, lits, pos_traces, neg_traces, pos_weights=None, neg_weights=None,
+               soft=False, trie=False, prune=(), seed_size=SEED_SIZE, batch_size=BATCH_SIZE):
+    self.trace_length = trace_length
+    self.lits = lits
+    self.pos_traces = pos_traces
+    self.neg_traces = neg_traces
+    self.pos_weights = [1]*len(pos_traces) if pos_weights is None else pos_weights
+    self.neg_weights = [1]*len(neg_traces) if neg_weights is None else neg_weights
+    self.soft = soft
+    self.trie = trie
+    self.prune = prune
+    self.batch_size = batch_size
+    self.pos_chosen = list(range(min(seed_size, len(pos_traces))))
+    self.neg_chosen = list(range(min(seed_size, len(neg_traces))))
+    # padded once, every candidate is evaluated on all traces
+    self.pos_padded = pad_traces(pos_traces, len(lits)) if pos_traces else None
+    self.neg_padded = pad_traces(neg_traces, len(lits)) if neg_traces else None
+
+  def counterexamples(self, formula, padded, label, chosen):
+    """
+    Indices of the traces outside chosen that formula gets wrong
+    """
+    if padded is None:
+      return []
+    wrong = np.nonzero(truth(formula, *padded) != label)[0]
+    chosen = set(chosen)
+    return [e for e in wrong.tolist() if e not in chosen]
+
+  def check(self, k):
+    """
+    Returns a tuple formula of size k that gets every trace outside the
+    subset right, or None if size k is unsatisfiable (SAT only)
+    """
+    while True:
+      target = encode(OptimizeTarget() if self.soft else SolverTarget(), k, self.trace_length, self.lits,
+                      [self.pos_traces[e] for e in self.pos_chosen], [self.neg_traces[e] for e in self.neg_chosen],
+                      pos_weights=[self.pos_weights[e] for e in self.pos_chosen],
+                      neg_weights=[self.neg_weights[e] for e in self.neg_chosen],
+                      trie=self.trie, prune=self.prune)
+      if target.check() == unsat:
+        return None
+      formula = decode_formula(target.model(), target.variables)
+      wrong_pos = self.counterexamples(formula, self.pos_padded, True, self.pos_chosen)
+      wrong_neg = self.counterexamples(formula, self.neg_padded, False, self.neg_chosen)
+      if not wrong_pos and not wrong_neg:
+        print(f"Size {k}: encoded {len(self.pos_chosen)}+{len(self.neg_chosen)} "
+              f"of {len(self.pos_traces)}+{len(self.neg_traces)} examples")
+        return formula
+      self.pos_chosen += wrong_pos[:self.batch_size]
+      self.neg_chosen += wrong_neg[:self.batch_size]
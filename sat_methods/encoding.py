@@ -0,0 +1,540 @@
+from z3 import *
+from itertools import product, combinations, permutations
+from variables import Variables
+import argparse
+import os
+import sys
+
+"""
+SAT/PMAX-SAT encoding of learning an LTLf formula of N nodes from traces.
+The constraints are emitted once into a target, which decides what the root
+constraints RUN(e, 1, 1)/RUN_d(e, 1, 1) (example e is accepted/rejected)
+become:
+  SolverTarget   - hard roots on a plain z3 Solver (SAT)
+  OptimizeTarget - soft roots on a z3 Optimize (PMAX-SAT)
+  CNFTarget      - DIMACS (hard roots) or WCNF (soft roots) for external solvers
+
+N - length of formula
+k - length of traces (examples may be shorter, each is encoded with its own length)
+n - number of variables
+
+prune lists optional constraints that cut down the search (see prunings);
+each only removes formulas that have an equal-sized or smaller equivalent.
+"""
+
+"""
+order    - operands of AND/OR are ordered by their operator (in skel_names order)
+patterns - no F F, G G, F over UNTIL, G over RELEASE (F(a U b) = F b, G(a R b) = G b)
+amo      - "each node has at most one parent" as one at-most-one constraint
+           per node instead of pairwise clauses over all triples
+X/WX at the last index are always excluded (see size_constraints).
+"""
+prunings = ["order", "patterns", "amo"]
+
+class SolverTarget:
+  def __init__(self):
+    # the SAT-based finite domain solver, much faster than the default
+    # Solver on these purely Boolean and pseudo-Boolean constraints
+    self.solver = SolverFor("QF_FD")
+
+  def add(self, *constraints):
+    self.solver.add(*constraints)
+
+  def add_root(self, root, weight=1):
+    self.solver.add(root)
+
+  def check(self, *assumptions):
+    return self.solver.check(*assumptions)
+
+  def model(self):
+    return self.solver.model()
+
+class OptimizeTarget:
+  # soft constraint weight can be any value less than 1, we choose 0.5
+  def __init__(self, weight=0.5):
+    self.optimizer = Optimize()
+    self.weight = weight
+
+  def add(self, *constraints):
+    self.optimizer.add(*constraints)
+
+  def add_root(self, root, weight=1):
+    self.optimizer.add_soft(root, self.weight * weight)
+
+  def check(self, *assumptions):
+    return self.optimizer.check(*assumptions)
+
+  def model(self):
+    return self.optimizer.model()
+
+class CNFTarget:
+  """
+  Collects the constraints in a z3 Goal and converts them to clauses on
+  write. Roots are unit clauses, hard ones or (with soft=True) soft ones
+  weighted by their example weights in a WCNF file.
+  """
+  def __init__(self, soft=False):
+    self.goal = Goal()
+    self.soft = soft
+    self.roots = []
+
+  def add(self, *constraints):
+    self.goal.add(*constraints)
+
+  def add_root(self, root, weight=1):
+    if self.soft:
+      self.roots.append((root, weight))
+    else:
+      self.goal.add(root)
+
+  def clauses(self):
+    """
+    Returns the clauses as lists of DIMACS literals and a dict from variable
+    names (e.g. "RUN(0, 1, 1)") to DIMACS variables
+    """
+    # cardinality constraints to clauses, then Tseitin for everything else
+    cnf = Then('card2bv', 'tseitin-cnf')(self.goal)[0]
+    clauses = []
+    names = dict()
+    num_vars = 0
+    for line in cnf.dimacs().splitlines():
+      if line.startswith("p "):
+        num_vars = int(line.split()[2])
+      elif line.startswith("c "):
+        _, var, name = line.split(" ", 2)
+        names[name] = int(var)
+      elif line:
+        clauses.append([int(lit) for lit in line.split()[:-1]])
+    for root, weight in self.roots:
+      if str(root) not in names:
+        num_vars += 1
+        names[str(root)] = num_vars
+    return clauses, names
+
+  def write(self, path):
+    """
+    Writes the encoding to path, with a "c <variable> <name>" line per named
+    variable so models can be mapped back to the encoding's variables
+    """
+    clauses, names = self.clauses()
+    num_vars = max(names.values(), default=0)
+    num_vars = max([num_vars] + [abs(lit) for clause in clauses for lit in clause])
+    with open(path, "w") as file:
+      if self.soft:
+        top = sum(weight for root, weight in self.roots) + 1
+        file.write(f"p wcnf {num_vars} {len(clauses) + len(self.roots)} {top}\n")
+        for clause in clauses:
+          file.write(" ".join(map(str, [top] + clause + [0])) + "\n")
+        for root, weight in self.roots:
+          file.write(f"{weight} {names[str(root)]} 0\n")
+      else:
+        file.write(f"p cnf {num_vars} {len(clauses)}\n")
+        for clause in clauses:
+          file.write(" ".join(map(str, clause + [0])) + "\n")
+      for name, var in sorted(names.items(), key=lambda item: item[1]):
+        file.write(f"c {var} {name}\n")
+    return names
+
+"""
+Emits the encoding of formula size N into a target and returns the target,
+with its variable tables as target.variables. pos_weights/neg_weights give
+how many traces each example stands for (see preprocess.py), which weighs
+its soft root. With trie=True, traces share the RUN variables of equal
+suffixes (see Variables).
+"""
+def encode(target, N, k, lits, pos_traces, neg_traces, metric=False, pos_weights=None, neg_weights=None, trie=False, prune=()):
+  variables = Variables(lits, pos_traces, neg_traces, trie)
+  target.variables = variables
+  add_nodes(target, variables, 0, N, lits, pos_traces, neg_traces, metric, pos_weights, neg_weights, prune)
+  target.add(size_constraints(variables, N, N, metric))
+  return target
+
+def create_sat(N, k, lits, pos_traces, neg_traces, metric=False, trie=False, prune=()):
+  return encode(SolverTarget(), N, k, lits, pos_traces, neg_traces, metric, trie=trie, prune=prune).solver
+
+def create_pmaxsat(N, k, lits, pos_traces, neg_traces, metric=False, pos_weights=None, neg_weights=None, trie=False, prune=()):
+  return encode(OptimizeTarget(), N, k, lits, pos_traces, neg_traces, metric, pos_weights, neg_weights, trie, prune).optimizer
+
+def one_of(v):
+  # either strategy works here
+  # return And(Or(v), And([Not(And(i, j)) for i, j in combinations(v, 2)]))
+  return PbEq([(elem, 1) for elem in v], 1)
+
+class IncrementalSAT:
+  """
+  One z3 Solver shared by all formula sizes. Nodes are added as the size
+  grows and the constraints that only hold for a formula of exactly m nodes
+  are guarded by the literal SIZE(m), which check passes as an assumption,
+  so learned clauses carry over from size to size.
+
+  The roots are hard by default. With an OptimizeTarget they are soft,
+  weighted by pos_weights/neg_weights, which makes it incremental PMAX-SAT.
+  """
+  def __init__(self, k, lits, pos_traces, neg_traces, metric=False, trie=False, target=None, pos_weights=None, neg_weights=None, prune=()):
+    self.target = SolverTarget() if target is None else target
+    self.k = k
+    self.lits = lits
+    self.pos_traces = pos_traces
+    self.neg_traces = neg_traces
+    self.metric = metric
+    self.pos_weights = pos_weights
+    self.neg_weights = neg_weights
+    self.prune = prune
+    self.variables = Variables(lits, pos_traces, neg_traces, trie)
+    self.N = 0
+
+  def extend(self, N):
+    add_nodes(self.target, self.variables, self.N, N, self.lits, self.pos_traces, self.neg_traces, self.metric, self.pos_weights, self.neg_weights, self.prune)
+    # the new nodes can't be subformulas of smaller formulas
+    for m in range(1, self.N+1):
+      self.target.add(Implies(Bool(f"SIZE({m})"), And(subformula_bounds(self.variables, m, self.N, N))))
+    for m in range(self.N+1, N+1):
+      self.target.add(Implies(Bool(f"SIZE({m})"), And(size_constraints(self.variables, m, N, self.metric))))
+    self.N = N
+
+  def check(self, N):
+    if N > self.N:
+      self.extend(N)
+    return self.target.check(Bool(f"SIZE({N})"))
+
+  def model(self):
+    return self.target.model()
+
+"""
+Constraint that the examples classified right at their roots weigh at least
+correct, e.g. more than those of the best formula found so far
+"""
+def beats(variables, correct, pos_weights=None, neg_weights=None):
+  if pos_weights is None:
+    pos_weights = [1]*len(variables.pos_roots)
+  if neg_weights is None:
+    neg_weights = [1]*len(variables.neg_roots)
+  roots = [(variables.RUN[p][1], w) for p, w in zip(variables.pos_roots, pos_weights)]
+  roots += [(variables.RUN_d[p][1], w) for p, w in zip(variables.neg_roots, neg_weights)]
+  return PbGe(roots, correct)
+
+"""
+Restricts nodes 1..N to subformulas among themselves, i.e. no A(s, s') or
+B(s, s') with N < s' <= max_N
+"""
+def subformula_bounds(variables, N, old_N, max_N):
+  A, B = variables.A, variables.B
+  bounds = []
+  for s, s_p in product(range(1, N+1), range(old_N+1, max_N+1)):
+    if s_p > N:
+      bounds.append(Not(A[s][s_p]))
+      bounds.append(Not(B[s][s_p]))
+  return bounds
+
+"""
+Constraints for a formula of exactly N nodes, when the encoding has max_N >= N
+nodes
+"""
+def size_constraints(variables, N, max_N, metric):
+  A, B, skel = variables.A, variables.B, variables.skel
+  constraints = []
+  for s in range(1, N+1):
+    subform_vars_a = []
+    subform_vars_b = []
+    for s_p in range(1, N+1):
+      if s + 1 <= s_p:
+        a = A[s][s_p]
+        subform_vars_a.append(a)
+      if s + 1 < s_p:
+        b = B[s][s_p]
+        subform_vars_b.append(b)
+    # each skeleton should have associated A if unary, an A and B if binary, and neither A or B if Lit
+    if (not subform_vars_a == []):
+      constraints.append(Or(one_of(subform_vars_a), skel["LIT"][s]))
+    if (not subform_vars_b == []):
+        # With or without metric operators
+      if metric:
+        constraints.append(Or(one_of(subform_vars_b), skel["LIT"][s], skel["NEXT"][s], skel["WNEXT"][s], skel["EVENTUALLY"][s], skel["ALWAYS"][s]))
+      else:
+        constraints.append(Or(one_of(subform_vars_b), skel["LIT"][s], skel["EVENTUALLY"][s], skel["ALWAYS"][s]))
+
+  constraints += subformula_bounds(variables, N, N, max_N)
+
+  # no unary operators at final index
+  if metric:
+      constraints.append(Not(skel["NEXT"][N]))
+      constraints.append(Not(skel["WNEXT"][N]))
+  constraints.append(Not(skel["EVENTUALLY"][N]))
+  constraints.append(Not(skel["ALWAYS"][N]))
+  constraints.append(Not(skel["AND"][N]))
+  constraints.append(Not(skel["OR"][N]))
+  constraints.append(Not(skel["UNTIL"][N]))
+  constraints.append(Not(skel["RELEASE"][N]))
+
+  # no binary operators at second to final index
+  constraints.append(Not(skel["AND"][N-1]))
+  constraints.append(Not(skel["OR"][N-1]))
+  constraints.append(Not(skel["UNTIL"][N-1]))
+  constraints.append(Not(skel["RELEASE"][N-1]))
+  return constraints
+
+"""
+Adds nodes N0+1..N to an encoding of nodes 1..N0: every constraint that
+holds for any formula size and involves one of the new nodes
+"""
+def add_nodes(target, variables, N0, N, lits, pos_traces, neg_traces, metric=False, pos_weights=None, neg_weights=None, prune=()):
+  n = len(lits)
+  if pos_weights is None:
+    pos_weights = [1]*len(pos_traces)
+  if neg_weights is None:
+    neg_weights = [1]*len(neg_traces)
+  variables.extend(N)
+  A, B, L, L_neg, skel, RUN, RUN_d = variables.A, variables.B, variables.L, variables.L_neg, variables.skel, variables.RUN, variables.RUN_d
+
+  # skeleton type variables
+  if metric:
+    skel_names = ["AND", "OR", "NEXT", "WNEXT", "UNTIL", "RELEASE", "EVENTUALLY", "ALWAYS", "LIT"]
+  else:
+    skel_names = ["AND", "OR", "UNTIL", "EVENTUALLY","RELEASE", "ALWAYS", "LIT"]
+
+  for s in range(N0+1, N+1):
+    skel_vars = [skel[name][s] for name in skel_names]
+    # add and restrict to one skeleton per node
+    target.add(one_of(skel_vars))
+
+  # trace variables - L(s, v) and L(s, -v)
+  for s in range(N0+1, N+1):
+    trace_vars = []
+    for i in range(n):
+      pos = L[s][i]
+      neg = L_neg[s][i]
+      trace_vars.append(pos)
+      trace_vars.append(neg)
+    # add and restrict to one trace var per lit
+    target.add(one_of(trace_vars))
+
+  # enforce formula size, prevent reuse of skeletons
+  if "amo" in prune:
+    # parents come before their children (see below), so the parents of a
+    # node are among the nodes before it
+    for s_p in range(max(N0+1, 1), N+1):
+      target.add(AtMost(*([A[s][s_p] for s in range(s_p)] + [B[s][s_p] for s in range(s_p)]), 1))
+  else:
+    for s, s_p, s_pp in product(range(N+1), repeat=3):
+      if N0 > 0 and max(s, s_p, s_pp) <= N0:
+        continue
+      if (not s == s_pp):
+        target.add(Not(And(A[s][s_p], A[s_pp][s_p])))
+        target.add(Not(And(B[s][s_p], B[s_pp][s_p])))
+      target.add(Not(And(A[s][s_p], B[s_pp][s_p])))
+
+  # enforce s, s_p, s_pp relationships
+  for s, s_p in product(range(1, N+1), repeat=2):
+      if max(s, s_p) <= N0:
+        continue
+      if not s + 1 <= s_p:
+        target.add(Not(A[s][s_p]))
+      if not s + 1 < s_p:
+        target.add(Not(B[s][s_p]))
+
+  # only the tuples with a new node
+  skel_triple = [(s, s_p, s_pp) for (s, s_p, s_pp) in permutations(range(1, N+1), 3) if s_p > s and s_pp > s_p and s_pp > N0]
+  skel_double = [(s, s_p) for (s, s_p) in permutations(range(1, N+1), 2) if s_p > s and s_p > N0]
+  skel_single = list(range(N0+1, N+1))
+
+  # no out of order subformula variables
+  for (s, s_p, s_pp) in skel_triple:
+    target.add(Not(And(A[s][s_pp], B[s][s_p])))
+
+  if "order" in prune:
+    # an operand of AND/OR can be swapped with the other, so only allow the
+    # operator of B to come at or after the operator of A in skel_names
+    for s, s_p, s_pp in skel_triple:
+      for op in ["AND", "OR"]:
+        for r, name in enumerate(skel_names):
+          target.add(Implies(And(skel[op][s], A[s][s_p], B[s][s_pp], skel[name][s_pp]), Or([skel[name_p][s_p] for name_p in skel_names[:r+1]])))
+
+  if "patterns" in prune:
+    for s, s_p in skel_double:
+      for op, child in [("EVENTUALLY", "EVENTUALLY"), ("ALWAYS", "ALWAYS"), ("EVENTUALLY", "UNTIL"), ("ALWAYS", "RELEASE")]:
+        target.add(Not(And(skel[op][s], A[s][s_p], skel[child][s_p])))
+
+
+  """
+  ACCEPTANCE OF POSITVE EXAMPLES
+  RUN[p] - the positions of the positive traces, next_p[p] - the position
+  after p (None at the end of a trace)
+  """
+  next_p = variables.pos_next
+
+  # add RUN(e, 1, 1) for each example, hard or soft depending on the target
+  if N0 == 0:
+    for e, p in enumerate(variables.pos_roots):
+      target.add_root(RUN[p][1], pos_weights[e])
+
+  # AND
+  for s, s_p, s_pp in skel_triple:
+    for p in range(len(RUN)):
+      target.add(Implies(And(RUN[p][s], skel["AND"][s], A[s][s_p]), RUN[p][s_p]))
+      target.add(Implies(And(RUN[p][s], skel["AND"][s], B[s][s_pp]), RUN[p][s_pp]))
+
+  # OR
+  for s, s_p, s_pp in skel_triple:
+    for p in range(len(RUN)):
+      target.add(Implies(And(RUN[p][s], skel["OR"][s], A[s][s_p], B[s][s_pp]), Or(RUN[p][s_p], RUN[p][s_pp])))
+
+  if metric:
+      # NEXT
+      for s, s_p in skel_double:
+        for p, q in enumerate(next_p):
+          if q is not None:
+            target.add(Implies(And(RUN[p][s], skel["NEXT"][s], A[s][s_p]), RUN[q][s_p]))
+          else:
+            target.add(Implies(And(RUN[p][s], skel["NEXT"][s], A[s][s_p]), False))
+
+      # WNEXT
+      for s, s_p in skel_double:
+        for p, q in enumerate(next_p):
+          if q is not None:
+            target.add(Implies(And(RUN[p][s], skel["WNEXT"][s], A[s][s_p]), RUN[q][s_p]))
+          else:
+            target.add(Implies(And(RUN[p][s], skel["WNEXT"][s], A[s][s_p]), True)) # vacuously true
+
+  # UNTIL
+  for s, s_p, s_pp in skel_triple:
+    for p, q in enumerate(next_p):
+      if q is not None:
+        target.add(Implies(And(RUN[p][s], skel["UNTIL"][s], A[s][s_p], B[s][s_pp]), Or(RUN[p][s_pp], And(RUN[q][s], RUN[p][s_p]))))
+      else:
+        target.add(Implies(And(RUN[p][s], skel["UNTIL"][s], B[s][s_pp]), RUN[p][s_pp]))
+
+  # RELEASE
+  for s, s_p, s_pp in skel_triple:
+    for p, q in enumerate(next_p):
+      if q is not None:
+        target.add(Implies(And(RUN[p][s], skel["RELEASE"][s], A[s][s_p], B[s][s_pp]), Or(RUN[p][s_p], RUN[q][s])))
+        target.add(Implies(And(RUN[p][s], skel["RELEASE"][s], B[s][s_pp]), RUN[p][s_pp]))
+      else:
+        target.add(Implies(And(RUN[p][s], skel["RELEASE"][s], B[s][s_pp]), RUN[p][s_pp]))
+
+  # EVENTUALLY
+  for s, s_p in skel_double:
+    for p, q in enumerate(next_p):
+      if q is not None:
+        target.add(Implies(And(RUN[p][s], skel["EVENTUALLY"][s], A[s][s_p]), Or(RUN[p][s_p], RUN[q][s])))
+      else:
+        target.add(Implies(And(RUN[p][s], skel["EVENTUALLY"][s], A[s][s_p]), RUN[p][s_p]))
+
+  # ALWAYS
+  for s, s_p in skel_double:
+    for p, q in enumerate(next_p):
+      if q is not None:
+        target.add(Implies(And(RUN[p][s], skel["ALWAYS"][s], A[s][s_p]), RUN[q][s]))
+        target.add(Implies(And(RUN[p][s], skel["ALWAYS"][s], A[s][s_p]), RUN[p][s_p]))
+      else:
+        target.add(Implies(And(RUN[p][s], skel["ALWAYS"][s], A[s][s_p]), RUN[p][s_p]))
+
+  # LIT
+  for s in skel_single:
+    for p, step in enumerate(variables.pos_steps):
+      for i in range(n):
+        if step[i]:
+          target.add(Implies(And(RUN[p][s], skel["LIT"][s], L_neg[s][i]), False))
+        else:
+          target.add(Implies(And(RUN[p][s], skel["LIT"][s], L[s][i]), False))
+
+  """
+  REJECTION OF NEGATIVE EXAMPLES
+  """
+  next_d = variables.neg_next
+
+  # add RUN_d(e, 1, 1) for each example, hard or soft depending on the target
+  if N0 == 0:
+    for e, p in enumerate(variables.neg_roots):
+      target.add_root(RUN_d[p][1], neg_weights[e])
+
+  # AND
+  for s, s_p, s_pp in skel_triple:
+    for p in range(len(RUN_d)):
+      target.add(Implies(And(RUN_d[p][s], skel["AND"][s], A[s][s_p], B[s][s_pp]), Or(RUN_d[p][s_p], RUN_d[p][s_pp])))
+
+  # OR
+  for s, s_p, s_pp in skel_triple:
+    for p in range(len(RUN_d)):
+      target.add(Implies(And(RUN_d[p][s], skel["OR"][s], A[s][s_p]), RUN_d[p][s_p]))
+      target.add(Implies(And(RUN_d[p][s], skel["OR"][s], B[s][s_pp]), RUN_d[p][s_pp]))
+
+  if metric:
+      # NEXT
+      for s, s_p in skel_double:
+        for p, q in enumerate(next_d):
+          if q is not None:
+            target.add(Implies(And(RUN_d[p][s], skel["NEXT"][s], A[s][s_p]), RUN_d[q][s_p]))
+          else:
+            target.add(Implies(And(RUN_d[p][s], skel["NEXT"][s], A[s][s_p]), True)) # vacuously true
+
+      # WNEXT
+      for s, s_p in skel_double:
+        for p, q in enumerate(next_d):
+          if q is not None:
+            target.add(Implies(And(RUN_d[p][s], skel["WNEXT"][s], A[s][s_p]), RUN_d[q][s_p]))
+          else:
+            target.add(Implies(And(RUN_d[p][s], skel["WNEXT"][s], A[s][s_p]), False))
+
+  # UNTIL
+  for s, s_p, s_pp in skel_triple:
+    for p, q in enumerate(next_d):
+      if q is not None:
+        target.add(Implies(And(RUN_d[p][s], skel["UNTIL"][s], A[s][s_p], B[s][s_pp]), Or(RUN_d[p][s_p], RUN_d[q][s])))
+        target.add(Implies(And(RUN_d[p][s], skel["UNTIL"][s], B[s][s_pp]), RUN_d[p][s_pp]))
+      else:
+        target.add(Implies(And(RUN_d[p][s], skel["UNTIL"][s], B[s][s_pp]), RUN_d[p][s_pp]))
+
+  # RELEASE
+  for s, s_p, s_pp in skel_triple:
+    for p, q in enumerate(next_d):
+      if q is not None:
+        target.add(Implies(And(RUN_d[p][s], skel["RELEASE"][s], A[s][s_p], B[s][s_pp]), Or(RUN_d[p][s_pp], And(RUN_d[q][s], RUN_d[p][s_p]))))
+      else:
+        target.add(Implies(And(RUN_d[p][s], skel["RELEASE"][s], B[s][s_pp]), RUN_d[p][s_pp]))
+
+  # EVENTUALLY
+  for s, s_p in skel_double:
+    for p, q in enumerate(next_d):
+      if q is not None:
+        target.add(Implies(And(RUN_d[p][s], skel["EVENTUALLY"][s], A[s][s_p]), RUN_d[q][s]))
+        target.add(Implies(And(RUN_d[p][s], skel["EVENTUALLY"][s], A[s][s_p]), RUN_d[p][s_p]))
+      else:
+        target.add(Implies(And(RUN_d[p][s], skel["EVENTUALLY"][s], A[s][s_p]), RUN_d[p][s_p]))
+
+  # ALWAYS
+  for s, s_p in skel_double:
+    for p, q in enumerate(next_d):
+      if q is not None:
+        target.add(Implies(And(RUN_d[p][s], skel["ALWAYS"][s], A[s][s_p]), Or(RUN_d[p][s_p], RUN_d[q][s])))
+      else:
+        target.add(Implies(And(RUN_d[p][s], skel["ALWAYS"][s], A[s][s_p]), RUN_d[p][s_p]))
+
+  # LIT
+  for s in skel_single:
+    for p, step in enumerate(variables.neg_steps):
+      for i in range(n):
+        # same as positive but the '-' is switched
+        if step[i]:
+          target.add(Implies(And(RUN_d[p][s], skel["LIT"][s], L[s][i]), False))
+        else:
+          target.add(Implies(And(RUN_d[p][s], skel["LIT"][s], L_neg[s][i]), False))
+
+if __name__ == "__main__":
+  trace_length = 15
+  lits = ["a","b","c"]
+  sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+  from packed_data import load_dataset
+  parser = argparse.ArgumentParser(description="Exports the encoding of one dataset as DIMACS or WCNF")
+  parser.add_argument('--data_path',required=True,type=str,help="Path to traces")
+  parser.add_argument('--n',required=True,type=int,help="Formula size of the dataset")
+  parser.add_argument('--i',required=True,type=int,help="Dataset number")
+  parser.add_argument('--N',required=True,type=int,help="Formula size to encode")
+  parser.add_argument('--output_file',required=True,type=str,help="File to write the clauses to")
+  parser.add_argument('--soft',action='store_true',help="Soft roots (PMAX-SAT) in WCNF instead of DIMACS")
+  args = parser.parse_args()
+  traces, labels = load_dataset(args.data_path, args.n, args.i)
+  positive_traces = [trace.astype(bool).tolist() for trace, label in zip(traces, labels) if label == 1.0]
+  negative_traces = [trace.astype(bool).tolist() for trace, label in zip(traces, labels) if label != 1.0]
+  target = encode(CNFTarget(args.soft), args.N, trace_length, lits, positive_traces, negative_traces)
+  target.write(args.output_file)
@@ -0,0 +1,117 @@
+from z3 import BoolVal
+import subprocess
+import threading
+import tempfile
+import shlex
+import os
+
+"""
+Solves encodings emitted into a CNFTarget (see encoding.py) with a solver
+other than z3:
+  "pysat" or "pysat:<name>" - the python-sat package if installed, with the
+                              SAT solver <name> (glucose4 by default) for
+                              hard roots and RC2 for soft ones
+  anything else             - the command of a solver binary (e.g. cadical,
+                              kissat, or a MaxSAT solver for soft roots) that
+                              takes the DIMACS/WCNF file as its last argument
+                              and prints competition style "s" and "v" lines
+"""
+
+class NamedModel:
+  """
+  A solution of the clauses, read like a z3 model through the names of the
+  encoding's variables, so utils.decode works on it. Variables that aren't
+  named in the clauses are false.
+  """
+  def __init__(self, names, true_vars):
+    self.names = names
+    self.true_vars = set(true_vars)
+
+  def eval(self, v, model_completion=False):
+    return BoolVal(self.names.get(str(v)) in self.true_vars)
+
+"""
+Returns (status, model) with status "sat", "unsat" or "unknown" (e.g. out of
+time) and a NamedModel for "sat", None otherwise. timeout is in seconds.
+"""
+def solve_external(target, solver, timeout=None):
+  if solver == "pysat" or solver.startswith("pysat:"):
+    return solve_pysat(target, solver.partition(":")[2] or "glucose4", timeout)
+  suffix = ".wcnf" if target.soft else ".cnf"
+  fd, path = tempfile.mkstemp(suffix=suffix)
+  os.close(fd)
+  try:
+    names = target.write(path)
+    try:
+      output = subprocess.run(shlex.split(solver) + [path], stdout=subprocess.PIPE,
+                              universal_newlines=True, timeout=timeout).stdout
+    except subprocess.TimeoutExpired:
+      return "unknown", None
+  finally:
+    os.remove(path)
+  return parse_solution(output, names)
+
+"""
+Reads the "s" and "v" lines of a SAT or MaxSAT solver. Values come as signed
+literals, or (newer MaxSAT solvers) as one string of 0/1 per variable.
+"""
+def parse_solution(output, names):
+  status = "unknown"
+  true_vars = []
+  for line in output.splitlines():
+    if line.startswith("s "):
+      answer = line[2:].strip()
+      if answer in ["SATISFIABLE", "OPTIMUM FOUND"]:
+        status = "sat"
+      elif answer == "UNSATISFIABLE":
+        status = "unsat"
+    elif line.startswith("v "):
+      values = line[2:].split()
+      if len(values) == 1 and len(values[0]) > 1 and set(values[0]) <= set("01"):
+        true_vars += [var+1 for var, value in enumerate(values[0]) if value == "1"]
+      else:
+        true_vars += [int(lit) for lit in values if int(lit) > 0]
+  if status != "sat":
+    return status, None
+  return status, NamedModel(names, true_vars)
+
+"""
+Solves with python-sat in this process, interrupted after timeout seconds
+"""
+def solve_pysat(target, name, timeout=None):
+  # optional, only needed for the pysat solvers
+  from pysat.solvers import Solver
+  from pysat.formula import WCNF
+  from pysat.examples.rc2 import RC2
+  clauses, names = target.clauses()
+  if target.soft:
+    wcnf = WCNF()
+    for clause in clauses:
+      wcnf.append(clause)
+    for root, weight in target.roots:
+      wcnf.append([names[str(root)]], weight=weight)
+    solver = RC2(wcnf)
+    solve = lambda: solver.compute(expect_interrupt=True)
+  else:
+    solver = Solver(name=name, bootstrap_with=clauses)
+    solve = lambda: solver.get_model() if solver.solve_limited(expect_interrupt=True) else None
+  timed_out = threading.Event()
+  def interrupt():
+    timed_out.set()
+    solver.interrupt()
+  timer = threading.Timer(timeout, interrupt) if timeout is not None else None
+  try:
+    if timer is not None:
+      timer.start()
+    model = solve()
+  finally:
+    if timer is not None:
+      # waits for an interrupt in progress, the solver must outlive it
+      timer.cancel()
+      timer.join()
+    solver.delete()
+  if timed_out.is_set():
+    return "unknown", None
+  if model is None:
+    return "unsat", None
+  return "sat", NamedModel(names, [lit for lit in model if lit > 0])
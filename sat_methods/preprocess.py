@@ -0,0 +1,61 @@
+"""
+Shrinks the traces of a dataset before encoding them. Identical traces become
+one example weighted by how many traces it stands for, and without metric
+operators (NEXT/WNEXT) the repeated last steps of a trace are cut, since
+formulas without them can't tell a trace from the same trace with its last
+step repeated (e.g. the padding of characteristic samples).
+"""
+
+"""
+Drops the repetitions of the last step of a trace
+"""
+def collapse_tail(trace):
+    end = len(trace)
+    while end > 1 and trace[end-1] == trace[end-2]:
+        end -= 1
+    return trace[:end]
+
+"""
+Returns the distinct (collapsed unless metric) traces and how many of the
+given traces each stands for
+"""
+def weighted_examples(traces, metric=False):
+    weights = dict()
+    for trace in traces:
+        if not metric:
+            trace = collapse_tail(trace)
+        key = tuple(tuple(step) for step in trace)
+        weights[key] = weights.get(key, 0) + 1
+    examples = [[list(step) for step in key] for key in weights]
+    return examples, list(weights.values())
+
+"""
+Returns positive examples, their weights, negative examples and their
+weights, plus a line reporting how much smaller the problem got
+"""
+def preprocess(positive_traces, negative_traces, metric=False):
+    pos, pos_weights = weighted_examples(positive_traces, metric)
+    neg, neg_weights = weighted_examples(negative_traces, metric)
+    steps = sum(len(trace) for trace in positive_traces + negative_traces)
+    new_steps = sum(len(trace) for trace in pos + neg)
+    report = (f"{len(positive_traces)}+{len(negative_traces)} traces ({steps} steps) -> "
+              f"{len(pos)}+{len(neg)} examples ({new_steps} steps), "
+              f"{steps / max(new_steps, 1):.1f}x fewer RUN variables")
+    return pos, pos_weights, neg, neg_weights, report
+
+"""
+Highest accuracy any formula can reach on the traces: a formula gives the
+same answer on equal traces (and without metric operators on traces that
+only differ in repeated last steps), so of those it can only get the larger
+class right
+"""
+def accuracy_bound(positive_traces, negative_traces, metric=False):
+    counts = dict()
+    for traces, label in [(positive_traces, 0), (negative_traces, 1)]:
+        for trace in traces:
+            if not metric:
+                trace = collapse_tail(trace)
+            key = tuple(tuple(step) for step in trace)
+            counts.setdefault(key, [0, 0])[label] += 1
+    correct = sum(max(count) for count in counts.values())
+    return correct / max(len(positive_traces) + len(negative_traces), 1)
@@ -1,10 +1,17 @@
 import os
 import pickle
 import numpy as np
-from pmaxsat import create_pmaxsat
-from utils import print_formula, err
+from encoding import encode, OptimizeTarget, CNFTarget, IncrementalSAT, prunings, beats
+from external import solve_external
+from utils import decode, formula_string, accuracy as formula_accuracy
+from cegar import CEGAR
+from preprocess import preprocess, accuracy_bound
+from z3 import unknown, unsat, Implies, Bool
 import time
 import argparse
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from packed_data import dataset_exists, load_dataset
 
 MAX_TIME = 300
 
@@ -12,27 +19,132 @@ MAX_TIME = 300
 Runs PMAX-SAT on a single formula. Since multiple formulas can be found,
 we need to record all of them. Thus can't run a separate thread for timeout
 purposes as in SAT. Instead we check the amount of time left after each run of
-the solver.
+the solver. With compress=True duplicate traces are encoded once with a
+weight (see preprocess.py), with trie=True traces share the RUN variables
+of equal suffixes, and prune lists the encoding.prunings to add. solver names
+a MaxSAT solver for external.solve_external to use instead of z3, given the
+time left; a size it can't finish in time is not recorded. With cegar=True
+only the traces needed are encoded (see cegar.py).
 """
-def single_formula_run_pmaxsat(positive_traces,negative_traces,trace_length,lits,formula_length):
+def single_formula_run_pmaxsat(positive_traces,negative_traces,trace_length,lits,formula_length,compress=False,trie=False,prune=(),solver=None,cegar=False):
+    if cegar and solver is not None:
+        raise ValueError("CEGAR encodes every round from scratch with z3")
     start_time = time.time()
+    pos_weights = None
+    neg_weights = None
+    if compress:
+        positive_traces, pos_weights, negative_traces, neg_weights, report = preprocess(positive_traces, negative_traces)
+        print(report)
     res = []
     time_left = MAX_TIME
     k = 1
+    if cegar:
+        subsets = CEGAR(trace_length, lits, positive_traces, negative_traces, pos_weights, neg_weights, soft=True, trie=trie, prune=prune)
     while time_left > 0:
-        optimizer = create_pmaxsat(k,trace_length,lits,positive_traces,negative_traces)
-        r = optimizer.check()
-        model = optimizer.model()
-        formula_print = print_formula(model)
-        error = err(model,len(positive_traces),len(negative_traces))
+        if cegar:
+            formula = subsets.check(k)
+            total_time = (time.time()-start_time)
+            time_left = MAX_TIME - total_time
+            if time_left > 0:
+                res.append((formula_length, total_time, formula_string(formula, lits), formula_accuracy(formula, len(lits), positive_traces, negative_traces, pos_weights, neg_weights)))
+            k += 1
+            continue
+        if solver is not None:
+            target = encode(CNFTarget(soft=True),k,trace_length,lits,positive_traces,negative_traces,pos_weights=pos_weights,neg_weights=neg_weights,trie=trie,prune=prune)
+            status, model = solve_external(target, solver, time_left)
+        else:
+            target = encode(OptimizeTarget(),k,trace_length,lits,positive_traces,negative_traces,pos_weights=pos_weights,neg_weights=neg_weights,trie=trie,prune=prune)
+            optimizer = target.optimizer
+            r = optimizer.check()
+            model = optimizer.model()
         total_time = (time.time()-start_time)
         time_left = MAX_TIME - total_time
-        if time_left > 0:
-            res.append((formula_length, total_time, formula_print, 1.0-error))
+        if time_left > 0 and model is not None:
+            formula_print, accuracy = decode(model,target.variables,positive_traces,negative_traces,pos_weights=pos_weights,neg_weights=neg_weights)
+            res.append((formula_length, total_time, formula_print, accuracy))
         k += 1
     return res
 
-def run_pmaxsat(data_file, output_file, num_formulas, trace_length, lits):
+"""
+Anytime PMAX-SAT on a single formula, recording (as single_formula_run_pmaxsat)
+only the formulas that improve on the best accuracy so far, each printed as it
+is found. One Optimize is kept across formula sizes (see IncrementalSAT) and
+every check gets the time left as its z3 timeout, so the run ends within
+MAX_TIME; a size whose check times out is not recorded.
+Stops early once the best accuracy reaches the highest one any formula can
+reach (preprocess.accuracy_bound), e.g. 1.0 on consistent traces. Every
+improvement becomes a hard bound the next formulas have to beat, so sizes
+that can't improve are refuted instead of optimized.
+
+With a warm start (warmstart.WarmStart), the extracted formula is the first
+result and the one to beat, sizes go up to its size, and at its size the
+solver softly prefers its structure.
+"""
+def anytime_run_pmaxsat(positive_traces,negative_traces,trace_length,lits,formula_length,compress=False,trie=False,prune=(),solver=None,warm=None):
+    if solver is not None:
+        raise ValueError("Only z3 can be used incrementally")
+    start_time = time.time()
+    bound = accuracy_bound(positive_traces, negative_traces)
+    pos_weights = None
+    neg_weights = None
+    if compress:
+        positive_traces, pos_weights, negative_traces, neg_weights, report = preprocess(positive_traces, negative_traces)
+        print(report)
+    total = len(positive_traces)+len(negative_traces) if pos_weights is None else sum(pos_weights)+sum(neg_weights)
+    optimizer = IncrementalSAT(trace_length, lits, positive_traces, negative_traces, trie=trie,
+                               target=OptimizeTarget(), pos_weights=pos_weights, neg_weights=neg_weights, prune=prune)
+    optimizer.extend(1)
+    res = []
+    best = -1.0
+    max_k = None
+    if warm is not None:
+        best = warm.accuracy
+        res.append((formula_length, time.time()-start_time, formula_string(warm.formula, lits), best))
+        optimizer.target.add(beats(optimizer.variables, round(best*total)+1, pos_weights, neg_weights))
+        if warm.expressible(False):
+            max_k = warm.size
+    k = 1
+    while best < bound and (max_k is None or k <= max_k):
+        time_left = MAX_TIME - (time.time()-start_time)
+        if time_left <= 0:
+            break
+        if k == max_k:
+            if optimizer.N < k:
+                optimizer.extend(k)
+            structure = warm.structure(optimizer.variables)
+            for literal in structure:
+                # all preferences together weigh less than one example (0.5)
+                optimizer.target.optimizer.add_soft(Implies(Bool(f"SIZE({k})"), literal), 0.25/len(structure))
+        optimizer.target.optimizer.set(timeout=int(time_left*1000))
+        r = optimizer.check(k)
+        if r == unknown:
+            # timed out, the model z3 has then may be partial
+            break
+        if r == unsat:
+            # no formula of size k beats the best so far
+            k += 1
+            continue
+        formula_print, accuracy = decode(optimizer.model(),optimizer.variables,positive_traces,negative_traces,pos_weights=pos_weights,neg_weights=neg_weights)
+        total_time = (time.time()-start_time)
+        if accuracy > best and total_time < MAX_TIME:
+            best = accuracy
+            res.append((formula_length, total_time, formula_print, accuracy))
+            print(f"[{time.strftime('%H:%M:%S')} {total_time:.1f}s] size {k}: {formula_print} with accuracy {accuracy}", flush=True)
+            optimizer.target.add(beats(optimizer.variables, round(best*total)+1, pos_weights, neg_weights))
+        k += 1
+    return res
+
+"""
+warm_start is the output_path of extract_formulas.py, whose formula for each
+dataset warm-starts the anytime mode (needs Spot)
+"""
+def run_pmaxsat(data_file, output_file, num_formulas, trace_length, lits, compress=False, trie=False, anytime=False, prune=(), solver=None, cegar=False, warm_start=None):
+    if anytime and cegar:
+        raise ValueError("The anytime mode keeps one encoding of all traces")
+    if warm_start is not None and not anytime:
+        raise ValueError("Only the anytime mode can be warm-started")
+    if warm_start is not None:
+        from warmstart import read_extracted, WarmStart
     for n in range(1, 16):
         count = 0
         for j in range(100):
@@ -40,17 +152,23 @@ def run_pmaxsat(data_file, output_file, num_formulas, trace_length, lits):
             # as it takes to get to num_formulas (up to 100)
             if count >= num_formulas:
                 break
-            if os.path.exists(f"{data_file}/{n}/train-{j}"):
+            if dataset_exists(data_file, n, j):
                 count += 1
-                traces,labels = pickle.load(open(f"{data_file}/{n}/train-{j}", "rb"))
+                traces,labels = load_dataset(data_file, n, j)
                 positive_traces = []
                 negative_traces = []
                 for trace, label in zip(traces,labels):
                     if label == 1.0:
-                        positive_traces.append(trace.numpy().astype(np.bool_).tolist())
+                        positive_traces.append(trace.astype(np.bool_).tolist())
                     else:
-                        negative_traces.append(trace.numpy().astype(np.bool_).tolist())
-                res = single_formula_run_pmaxsat(positive_traces,negative_traces,trace_length,lits,n)
+                        negative_traces.append(trace.astype(np.bool_).tolist())
+                if anytime:
+                    warm = None
+                    if warm_start is not None and count <= len(read_extracted(warm_start, n)):
+                        warm = WarmStart(read_extracted(warm_start, n)[count-1], lits, positive_traces, negative_traces)
+                    res = anytime_run_pmaxsat(positive_traces,negative_traces,trace_length,lits,n,compress,trie,prune,solver,warm)
+                else:
+                    res = single_formula_run_pmaxsat(positive_traces,negative_traces,trace_length,lits,n,compress,trie,prune,solver,cegar)
                 print(f"Size {n} number {count}: {res}")
                 with open(output_file,"ab+") as file:
                     pickle.dump(res,file)
@@ -62,5 +180,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Inputs for LTL test")
     parser.add_argument('--data_path',required=True,type=str,help="Path to traces for testing")
     parser.add_argument('--output_file',required=True,type=str,help="File to write outputs to using pickle")
+    parser.add_argument('--compress',action='store_true',help="Merge duplicate traces into weighted examples")
+    parser.add_argument('--trie',action='store_true',help="Share RUN variables between equal trace suffixes")
+    parser.add_argument('--anytime',action='store_true',help="Reuse one Optimize across sizes, bound it by the time left and stop at the best reachable accuracy")
+    parser.add_argument('--prune',default=[],nargs='*',choices=prunings,help="Pruning constraints to add to the encoding")
+    parser.add_argument('--solver',default=None,type=str,help="External MaxSAT solver instead of z3: pysat, or a solver command")
+    parser.add_argument('--cegar',action='store_true',help="Encode only the traces earlier candidate formulas got wrong")
+    parser.add_argument('--warm_start',default=None,type=str,help="Path extract_formulas.py wrote formulas to, whose accuracy --anytime has to beat")
     args = parser.parse_args()
-    run_pmaxsat(args.data_path, args.output_file, num_formulas, trace_length, lits)
+    run_pmaxsat(args.data_path, args.output_file, num_formulas, trace_length, lits, args.compress, args.trie, args.anytime, args.prune, args.solver, args.cegar, args.warm_start)
@@ -0,0 +1,198 @@
+import multiprocessing
+from multiprocessing.connection import wait
+import itertools
+import argparse
+import pickle
+import time
+import os
+import signal
+from run_sat import MAX_TIME, check_sizes, formula_datasets
+from encoding import prunings
+
+"""
+Runs the SAT method on many datasets at once on a pool of worker processes,
+and races several lanes on each dataset. A lane is a solver configuration
+(see parse_config) checking every size_lanes-th formula size: with
+size_lanes=2 one lane checks sizes 1, 3, 5, ... and another 2, 4, 6, ...
+A dataset is solved at its smallest size found satisfiable once every smaller
+size has been found unsatisfiable by some lane. Its lanes are then killed,
+as they are when it runs out of its MAX_TIME seconds, and the result is
+appended to the output file in the format of run_sat.py.
+"""
+
+"""
+Turns a configuration like "incremental+trie" into the keyword arguments of
+check_sizes, "plain" for none of them. Prunings are named as in
+encoding.prunings, "prune" for all of them, and "solver=<solver>" solves
+with an external solver (see external.py) instead of z3.
+"""
+def parse_config(config):
+    options = {"incremental": False, "compress": False, "trie": False, "cegar": False}
+    prune = []
+    for option in config.split("+"):
+        if option == "plain":
+            continue
+        if option.startswith("solver="):
+            options["solver"] = option[len("solver="):]
+            continue
+        if option == "prune":
+            prune += prunings
+            continue
+        if option in prunings:
+            prune.append(option)
+            continue
+        if option not in options:
+            raise ValueError(f"Unknown SAT option {option} in {config}")
+        options[option] = True
+    options["prune"] = tuple(prune)
+    return options
+
+"""
+Checks the sizes first_size, first_size+stride, ... of one dataset and sends
+(k, sat, formula, accuracy) for each over conn, until one is satisfiable
+"""
+def run_lane(conn, positive_traces, negative_traces, trace_length, lits, config, first_size, stride):
+    # its own process group, so that killing the lane also kills the
+    # external solvers it starts
+    os.setpgrp()
+    sizes = itertools.count(first_size, stride)
+    for res in check_sizes(positive_traces, negative_traces, trace_length, lits, sizes, **parse_config(config)):
+        conn.send(res)
+        if res[1]:
+            break
+    conn.close()
+
+class Problem:
+    """
+    The lanes of one dataset and what they found so far
+    """
+    def __init__(self, n, count, positive_traces, negative_traces):
+        self.n = n
+        self.count = count
+        self.positive_traces = positive_traces
+        self.negative_traces = negative_traces
+        self.lanes = []
+        self.unsat = set()
+        self.sat = dict()
+        self.start_time = None
+
+    def start(self, trace_length, lits, configs, size_lanes):
+        self.start_time = time.time()
+        for config in configs:
+            for first_size in range(1, size_lanes+1):
+                recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=run_lane, daemon=True,
+                    args=(send_conn, self.positive_traces, self.negative_traces,
+                          trace_length, lits, config, first_size, size_lanes))
+                process.start()
+                # the lane holds the only send end, so recv_conn sees EOF when it dies
+                send_conn.close()
+                self.lanes.append((process, recv_conn))
+
+    def record(self, k, sat, formula, accuracy):
+        if sat:
+            if k not in self.sat:
+                self.sat[k] = (formula, accuracy)
+        else:
+            self.unsat.add(k)
+
+    def result(self):
+        """
+        (n, time, formula, accuracy) as in run_sat.py once solved or out of
+        time, None otherwise
+        """
+        total_time = time.time() - self.start_time
+        if self.sat:
+            k = min(self.sat)
+            if all(m in self.unsat for m in range(1, k)):
+                formula, accuracy = self.sat[k]
+                return self.n, total_time, formula, accuracy
+        if total_time >= MAX_TIME:
+            return self.n, MAX_TIME, "TIMED OUT", 0.0
+        return None
+
+    def kill(self):
+        for process, conn in self.lanes:
+            conn.close()
+            signal_lane(process, signal.SIGTERM)
+        for process, conn in self.lanes:
+            # z3 can ignore SIGTERM while inside a solver call
+            process.join(1)
+            # a solver can outlive its lane
+            signal_lane(process, signal.SIGKILL)
+            process.join()
+
+"""
+Sends sig to a lane and the solvers in its process group
+"""
+def signal_lane(process, sig):
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        # the group is gone, or the lane hasn't made it yet
+        pass
+    if process.is_alive():
+        os.kill(process.pid, sig)
+
+def run_portfolio(data_file, output_file, num_formulas, trace_length, lits, configs, size_lanes, num_workers):
+    for config in configs:
+        parse_config(config)
+    lanes_per_problem = len(configs) * size_lanes
+    if lanes_per_problem > num_workers:
+        raise ValueError(f"{lanes_per_problem} lanes per dataset don't fit on {num_workers} workers")
+    datasets = formula_datasets(data_file, num_formulas)
+    running = []
+    done = 0
+    start_time = time.time()
+    try:
+        while True:
+            # start datasets while their lanes fit
+            while len(running) + 1 <= num_workers // lanes_per_problem:
+                dataset = next(datasets, None)
+                if dataset is None:
+                    break
+                problem = Problem(*dataset)
+                problem.start(trace_length, lits, configs, size_lanes)
+                running.append(problem)
+            if not running:
+                break
+
+            conns = {conn: problem for problem in running for process, conn in problem.lanes if not conn.closed}
+            # wake up at the latest when the first dataset runs out of time
+            timeout = min(problem.start_time + MAX_TIME for problem in running) - time.time()
+            for conn in wait(list(conns), max(timeout, 0)):
+                try:
+                    conns[conn].record(*conn.recv())
+                except EOFError:
+                    conn.close()
+
+            for problem in list(running):
+                res = problem.result()
+                if res is None:
+                    continue
+                problem.kill()
+                running.remove(problem)
+                done += 1
+                print(f"[{done} {time.time()-start_time:.0f}s] Size {problem.n} number {problem.count}: {res}")
+                # only the parent writes, one result per finished dataset
+                with open(output_file, "ab+") as file:
+                    pickle.dump(res, file)
+    finally:
+        # daemon lanes are terminated on exit, but not the solvers they started
+        for problem in running:
+            problem.kill()
+
+if __name__ == "__main__":
+    trace_length = 15
+    lits = ["a","b","c"]
+    num_formulas = 50
+    parser = argparse.ArgumentParser(description="Runs the SAT method on a pool of worker processes")
+    parser.add_argument('--data_path',required=True,type=str,help="Path to traces for testing")
+    parser.add_argument('--output_file',required=True,type=str,help="File to write outputs to using pickle")
+    parser.add_argument('--configs',default=["plain"],nargs='+',type=str,
+                        help="Solver configurations raced on each dataset, e.g. plain incremental+trie compress")
+    parser.add_argument('--size_lanes',default=1,type=int,help="Lanes per configuration, each checking every size_lanes-th size")
+    parser.add_argument('--num_workers',default=os.cpu_count(),type=int,help="Number of worker processes")
+    args = parser.parse_args()
+    run_portfolio(args.data_path, args.output_file, num_formulas, trace_length, lits,
+                  args.configs, args.size_lanes, args.num_workers)
@@ -2,37 +2,104 @@ import timeout_decorator
 import os
 import pickle
 import numpy as np
-from pmaxsat import create_pmaxsat
-from sat import create_sat
-from utils import print_formula, err
+from encoding import encode, SolverTarget, CNFTarget, IncrementalSAT, prunings
+from external import solve_external
+from utils import decode, formula_string, accuracy as formula_accuracy
+from cegar import CEGAR
+from preprocess import preprocess
 import time
+import itertools
 import argparse
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from packed_data import dataset_exists, load_dataset
 
 
 MAX_TIME = 300
+
 """
-Runs SAT on a single formula for MAX_TIME seconds
+Checks the formula sizes in sizes one after another (ascending), yielding
+(k, sat, formula, accuracy) per size, with None formula and accuracy for
+unsatisfiable sizes. With incremental=True one solver is kept across formula
+sizes instead of encoding every size from scratch. With compress=True
+duplicate traces are encoded once (see preprocess.py), with trie=True
+traces share the RUN variables of equal suffixes, and prune lists the
+encoding.prunings to add. solver names a solver for external.solve_external
+to use instead of z3, given at most MAX_TIME seconds per size. With
+cegar=True only the traces needed are encoded (see cegar.py).
 """
-@timeout_decorator.timeout(MAX_TIME,use_signals=False)
-def single_formula_run_sat(positive_traces,negative_traces,trace_length,lits,formula_length):
-    start_time = time.time()
-    k = 1
-    while True:
-        optimizer = create_sat(k, trace_length, lits, positive_traces, negative_traces)
-        r = optimizer.check()
-        k += 1
-        if r.r == -1:
+def check_sizes(positive_traces,negative_traces,trace_length,lits,sizes,incremental=False,compress=False,trie=False,prune=(),solver=None,cegar=False):
+    if incremental and solver is not None:
+        raise ValueError("Only z3 can be used incrementally")
+    if cegar and (incremental or solver is not None):
+        raise ValueError("CEGAR encodes every round from scratch with z3")
+    pos_weights = None
+    neg_weights = None
+    if compress:
+        positive_traces, pos_weights, negative_traces, neg_weights, report = preprocess(positive_traces, negative_traces)
+        print(report)
+    if incremental:
+        optimizer = IncrementalSAT(trace_length, lits, positive_traces, negative_traces, trie=trie, prune=prune)
+        variables = optimizer.variables
+    if cegar:
+        subsets = CEGAR(trace_length, lits, positive_traces, negative_traces, pos_weights, neg_weights, trie=trie, prune=prune)
+    for k in sizes:
+        if cegar:
+            formula = subsets.check(k)
+            if formula is None:
+                yield k, False, None, None
+            else:
+                yield k, True, formula_string(formula, lits), formula_accuracy(formula, len(lits), positive_traces, negative_traces, pos_weights, neg_weights)
             continue
+        if solver is not None:
+            target = encode(CNFTarget(), k, trace_length, lits, positive_traces, negative_traces, trie=trie, prune=prune)
+            variables = target.variables
+            status, model = solve_external(target, solver, MAX_TIME)
+            # like z3, only unsat moves on to the next size
+            sat = status != "unsat"
         else:
-            break
+            if incremental:
+                r = optimizer.check(k)
+            else:
+                target = encode(SolverTarget(), k, trace_length, lits, positive_traces, negative_traces, trie=trie, prune=prune)
+                optimizer = target.solver
+                variables = target.variables
+                r = optimizer.check()
+            sat = r.r != -1
+            model = optimizer.model() if sat else None
+        if not sat:
+            yield k, False, None, None
+        elif model is None:
+            yield k, True, "UNKNOWN", 0.0
+        else:
+            formula_print, accuracy = decode(model,variables,positive_traces,negative_traces,pos_weights=pos_weights,neg_weights=neg_weights)
+            yield k, True, formula_print, accuracy
 
-    model = optimizer.model()
-    formula_print = print_formula(model)
-    error = err(model,len(positive_traces),len(negative_traces))
+"""
+Runs SAT on a single formula for MAX_TIME seconds, from size 1 up to the
+first satisfiable size (see check_sizes for the options). A warm start
+(warmstart.WarmStart) whose formula is consistent bounds the sizes: if no
+smaller size is satisfiable, its formula is the result.
+"""
+@timeout_decorator.timeout(MAX_TIME,use_signals=False)
+def single_formula_run_sat(positive_traces,negative_traces,trace_length,lits,formula_length,incremental=False,compress=False,trie=False,prune=(),solver=None,cegar=False,warm=None):
+    start_time = time.time()
+    sizes = itertools.count(1)
+    if warm is not None and warm.accuracy == 1.0 and warm.expressible(False):
+        sizes = range(1, warm.size)
+    for k, sat, formula_print, accuracy in check_sizes(positive_traces,negative_traces,trace_length,lits,sizes,incremental,compress,trie,prune,solver,cegar):
+        if sat:
+            break
+    else:
+        formula_print, accuracy = formula_string(warm.formula, lits), warm.accuracy
     total_time = (time.time()-start_time)
-    return formula_length, total_time, formula_print, 1.0-error
+    return formula_length, total_time, formula_print, accuracy
 
-def run_sat(data_file,output_file,num_formulas,trace_length,lits):
+"""
+Yields (n, count, positive_traces, negative_traces) for the first
+num_formulas datasets of every formula size
+"""
+def formula_datasets(data_file,num_formulas):
     for n in range(1, 16):
         count = 0
         for j in range(100):
@@ -40,23 +107,36 @@ def run_sat(data_file,output_file,num_formulas,trace_length,lits):
             # as it takes to get to num_formulas (up to 100)
             if count >= num_formulas:
                 break
-            if os.path.exists(f"{data_file}/{n}/train-{j}"):
+            if dataset_exists(data_file, n, j):
                 count += 1
-                traces,labels = pickle.load(open(f"{data_file}/{n}/train-{j}", "rb"))
+                traces,labels = load_dataset(data_file, n, j)
                 positive_traces = []
                 negative_traces = []
                 for trace, label in zip(traces,labels):
                     if label == 1.0:
-                        positive_traces.append(trace.numpy().astype(np.bool_).tolist())
+                        positive_traces.append(trace.astype(np.bool_).tolist())
                     else:
-                        negative_traces.append(trace.numpy().astype(np.bool_).tolist())
-                try:
-                    res = single_formula_run_sat(positive_traces,negative_traces,trace_length,lits,n)
-                except timeout_decorator.timeout_decorator.TimeoutError:
-                    res = (n,MAX_TIME,"TIMED OUT", 0.0)
-                print(f"Size {n} number {count}: {res}")
-                with open(output_file,"ab+") as file:
-                    pickle.dump(res,file)
+                        negative_traces.append(trace.astype(np.bool_).tolist())
+                yield n, count, positive_traces, negative_traces
+
+"""
+warm_start is the output_path of extract_formulas.py, whose formula for each
+dataset warm-starts the search (needs Spot)
+"""
+def run_sat(data_file,output_file,num_formulas,trace_length,lits,incremental=False,compress=False,trie=False,prune=(),solver=None,cegar=False,warm_start=None):
+    if warm_start is not None:
+        from warmstart import read_extracted, WarmStart
+    for n, count, positive_traces, negative_traces in formula_datasets(data_file,num_formulas):
+        warm = None
+        if warm_start is not None and count <= len(read_extracted(warm_start, n)):
+            warm = WarmStart(read_extracted(warm_start, n)[count-1], lits, positive_traces, negative_traces)
+        try:
+            res = single_formula_run_sat(positive_traces,negative_traces,trace_length,lits,n,incremental,compress,trie,prune,solver,cegar,warm)
+        except timeout_decorator.timeout_decorator.TimeoutError:
+            res = (n,MAX_TIME,"TIMED OUT", 0.0)
+        print(f"Size {n} number {count}: {res}")
+        with open(output_file,"ab+") as file:
+            pickle.dump(res,file)
 
 
 if __name__ == "__main__":
@@ -66,5 +146,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Inputs for LTL test")
     parser.add_argument('--data_path',required=True,type=str,help="Path to traces for testing")
     parser.add_argument('--output_file',required=True,type=str,help="File to write outputs to using pickle")
+    parser.add_argument('--incremental',action='store_true',help="Reuse one solver across formula sizes")
+    parser.add_argument('--compress',action='store_true',help="Merge duplicate traces into weighted examples")
+    parser.add_argument('--trie',action='store_true',help="Share RUN variables between equal trace suffixes")
+    parser.add_argument('--prune',default=[],nargs='*',choices=prunings,help="Pruning constraints to add to the encoding")
+    parser.add_argument('--solver',default=None,type=str,help="External solver instead of z3: pysat, pysat:<name> or a solver command")
+    parser.add_argument('--cegar',action='store_true',help="Encode only the traces earlier candidate formulas got wrong")
+    parser.add_argument('--warm_start',default=None,type=str,help="Path extract_formulas.py wrote formulas to, to bound the sizes by")
     args = parser.parse_args()
-    run_sat(args.data_path,args.output_file,num_formulas,trace_length,lits)
+    run_sat(args.data_path,args.output_file,num_formulas,trace_length,lits,args.incremental,args.compress,args.trie,args.prune,args.solver,args.cegar,args.warm_start)
@@ -1,89 +1,74 @@
-import re
+import os
+import sys
+import numpy as np
+from z3 import is_true
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ltlf_eval import truth, formula_string
 
 """
-Formula printing functions
+Decoding functions. They look up the skeleton, A/B and L variables of each
+node in the encoder's variable tables (see variables.py) and build a tuple
+formula as in ltlf_eval.py.
 """
-def print_formula(model):
-  formula = ""
-  operator_mapping = {
-      r'AND\(\d+\)': "^",
-      r'OR\(\d+\)': "v",
-      r'NEXT\(\d+\)': "X",
-      r'WNEXT\(\d+\)': "N",
-      r'UNTIL\(\d+\)': "U",
-      r'RELEASE\(\d+\)': "R",
-      r'EVENTUALLY\(\d+\)': "F",
-      r'ALWAYS\(\d+\)': "G",
-      r'LIT\(\d+\)': "TERM"
-  }
-  binary_operators = [r'AND\(\d+\)',r'OR\(\d+\)',r'UNTIL\(\d+\)',r'RELEASE\(\d+\)']
-  return print_formula_recurse(1,model,operator_mapping,binary_operators)
+unary_operators = ["NEXT", "WNEXT", "EVENTUALLY", "ALWAYS"]
+binary_operators = ["AND", "OR", "UNTIL", "RELEASE"]
 
-def find_subformulae(s,model,is_binary):
-  a_index = None
-  b_index = None
-  for statement in model:
-      if model[statement]:
-        if re.match(r'A\(\d+, \d+\)',str(statement)):
-          numbers = re.findall(r'\d+',str(statement))
-          if int(numbers[0]) == s:
-            a_index = int(numbers[1])
-        if is_binary:
-          if re.match(r'B\(\d+, \d+\)',str(statement)):
-            numbers = re.findall(r'\d+',str(statement))
-            if int(numbers[0]) == s:
-              b_index = int(numbers[1])
-  if is_binary:
-    return a_index, b_index
-  else:
-    return a_index
+def holds(model, v):
+  return is_true(model.eval(v, model_completion=True))
 
-def find_literal(s,model):
-  for statement in model:
-    if model[statement]:
-      if re.match(r'L\(\d+, -?[a-zA-Z]+\)',str(statement)):
-        number = int(re.search(r'\d+',str(statement)).group())
-        if number == s:
-          literal = re.findall(r'-?[a-zA-Z]+',str(statement))[1]
-          return literal
-  return None
+"""
+Returns the subformula at node s (the whole formula for s=1) as a tuple
+formula. Without metric, the NEXT/WNEXT skeleton variables are not
+constrained by the encoding and are ignored.
+"""
+def decode_formula(model, variables, s=1, metric=False):
+  names = [name for name in variables.skel if metric or name not in ["NEXT", "WNEXT"]]
+  op = next(name for name in names if holds(model, variables.skel[name][s]))
+  if op == "LIT":
+    for i in range(len(variables.lits)):
+      if holds(model, variables.L[s][i]):
+        return ("LIT", i)
+      if holds(model, variables.L_neg[s][i]):
+        return ("NOT", ("LIT", i))
+  a = next(s_p for s_p in range(s+1, variables.N+1) if holds(model, variables.A[s][s_p]))
+  if op in unary_operators:
+    return (op, decode_formula(model, variables, a, metric))
+  b = next(s_p for s_p in range(s+1, variables.N+1) if holds(model, variables.B[s][s_p]))
+  return (op, decode_formula(model, variables, a, metric), decode_formula(model, variables, b, metric))
 
-def print_formula_recurse(s,model,operator_mapping,binary_operators):
-  formula = ""
-  for statement in model:
-      if model[statement]:
-        for operator in operator_mapping.keys():
-          if re.match(operator,str(statement)):
-            if int(re.search(r'\d+',str(statement)).group()) == s:
-              # Literal case
-              if operator == r'LIT\(\d+\)':
-                formula = find_literal(s,model)
-                return formula
-              formula = formula + operator_mapping[operator]
-              # Binary operator case
-              if operator in binary_operators:
-                a_index, b_index = find_subformulae(s,model,True)
-                left_formula = print_formula_recurse(a_index,model,operator_mapping,binary_operators)
-                right_formula = print_formula_recurse(b_index,model,operator_mapping,binary_operators)
-                formula = "(" + left_formula + ")" + formula + "(" + right_formula + ")"
-                return formula
-              # Unary operator case
-              else:
-                a_index = find_subformulae(s,model,False)
-                right_formula = print_formula_recurse(a_index,model,operator_mapping,binary_operators)
-                formula = formula + "(" + right_formula + ")"
-                return formula
-  return formula
+"""
+Pads traces of different lengths into a (traces, time, vars) array, returns
+it with the lengths
+"""
+def pad_traces(traces, num_vars):
+  lengths = np.array([len(trace) for trace in traces], dtype=np.int64)
+  padded = np.zeros((len(traces), max(lengths, default=1), num_vars), dtype=np.bool_)
+  for e, trace in enumerate(traces):
+    padded[e, :len(trace)] = trace
+  return padded, lengths
 
-def err(model, num_pos, num_neg):
-  regex_p = re.compile('RUN\(([0-9])+, 1, 1\)')
-  regex_n = re.compile('RUN_d\(([0-9])+, 1, 1\)')
-  pos = 0
-  neg = 0
-  for v in model:
-    if model[v]:
-      if regex_p.match(str(v)):
-        pos = pos + 1
-      if regex_n.match(str(v)):
-        neg = neg + 1
-  return 1 - (pos+neg)/(num_pos+num_neg)
+"""
+Weighted fraction of examples a tuple formula classifies correctly,
+evaluated on the traces themselves
+"""
+def accuracy(formula, num_vars, pos_traces, neg_traces, pos_weights=None, neg_weights=None):
+  if pos_weights is None:
+    pos_weights = [1]*len(pos_traces)
+  if neg_weights is None:
+    neg_weights = [1]*len(neg_traces)
+  correct = 0
+  for traces, weights, label in [(pos_traces, pos_weights, True), (neg_traces, neg_weights, False)]:
+    if len(traces) == 0:
+      continue
+    padded, lengths = pad_traces(traces, num_vars)
+    correct += np.dot(truth(formula, padded, lengths) == label, weights)
+  return float(correct) / (sum(pos_weights)+sum(neg_weights))
+
+"""
+Decodes the formula of a model and its accuracy on the traces: returns a
+(string, accuracy) pair
+"""
+def decode(model, variables, pos_traces, neg_traces, metric=False, pos_weights=None, neg_weights=None):
+  formula = decode_formula(model, variables, 1, metric)
+  acc = accuracy(formula, len(variables.lits), pos_traces, neg_traces, pos_weights, neg_weights)
+  return formula_string(formula, variables.lits), acc
@@ -0,0 +1,117 @@
+from z3 import Bool, is_true
+
+skel_names = ["AND", "OR", "NEXT", "WNEXT", "UNTIL", "RELEASE", "EVENTUALLY", "ALWAYS", "LIT"]
+
+class Variables:
+  """
+  Dense tables of the z3 Bools of the SAT/PMAX-SAT encodings, so each one is
+  created once instead of on every use. The Bools keep the names the
+  encodings always used (e.g. RUN(e, t, s)), which utils decodes models by.
+
+    skel[name][s]   - name(s)
+    L[s][i]         - L(s, lits[i])
+    L_neg[s][i]     - L(s, -lits[i])
+    A[s][s_p]       - A(s, s_p)
+    B[s][s_p]       - B(s, s_p)
+    RUN[p][s]       - RUN(e, t, s), node s holds at position p of the positive traces
+    RUN_d[p][s]     - RUN_d(e, t, s), node s fails at position p of the negative traces
+
+  A position is a timestep t (1..its length) of an example e. pos_next[p]
+  is the position of timestep t+1 (None at the last one), pos_steps[p] the
+  values of the variables at t and pos_roots[e] the position of timestep 1
+  (neg_* likewise). With trie=True, timesteps whose suffixes are equal
+  share a position, since the truth of a subformula at t only depends on
+  the trace from t on. Such positions are named after the first (e, t).
+
+  Nodes are indexed 0..N (node 0 only appears in the A/B and skeleton
+  tables), and extend(N) adds the Bools of new nodes.
+  """
+  def __init__(self, lits, pos_traces, neg_traces, trie=False):
+    self.lits = lits
+    self.N = -1
+    self.skel = {name: [] for name in skel_names}
+    self.L = []
+    self.L_neg = []
+    self.A = []
+    self.B = []
+    self.RUN = []
+    self.RUN_d = []
+    self.pos_names, self.pos_steps, self.pos_next, self.pos_roots = positions(pos_traces, trie)
+    self.neg_names, self.neg_steps, self.neg_next, self.neg_roots = positions(neg_traces, trie)
+    for p in range(len(self.pos_names)):
+      self.RUN.append([None])
+    for p in range(len(self.neg_names)):
+      self.RUN_d.append([None])
+
+  def extend(self, N):
+    new_nodes = range(self.N+1, N+1)
+    for s in new_nodes:
+      for name in skel_names:
+        self.skel[name].append(Bool(f"{name}({s})"))
+      self.L.append([Bool(f"L({s}, {l})") for l in self.lits])
+      self.L_neg.append([Bool(f"L({s}, -{l})") for l in self.lits])
+    # new columns of the existing rows, then the new rows
+    for s in range(self.N+1):
+      self.A[s] += [Bool(f"A({s}, {s_p})") for s_p in new_nodes]
+      self.B[s] += [Bool(f"B({s}, {s_p})") for s_p in new_nodes]
+    for s in new_nodes:
+      self.A.append([Bool(f"A({s}, {s_p})") for s_p in range(N+1)])
+      self.B.append([Bool(f"B({s}, {s_p})") for s_p in range(N+1)])
+    for run, names, name in [(self.RUN, self.pos_names, "RUN"), (self.RUN_d, self.neg_names, "RUN_d")]:
+      for p, (e, t) in enumerate(names):
+        run[p] += [Bool(f"{name}({e}, {t}, {s})") for s in new_nodes if s > 0]
+    self.N = N
+
+  def err(self, model, pos_weights=None, neg_weights=None):
+    """
+    Fraction of examples the model gets wrong, read from the root position
+    of each example, so that it also works when examples share positions.
+    With weights, example e counts pos_weights[e] (neg_weights[e]) times,
+    e.g. after preprocess.
+    """
+    if pos_weights is None:
+      pos_weights = [1]*len(self.pos_roots)
+    if neg_weights is None:
+      neg_weights = [1]*len(self.neg_roots)
+    correct = 0
+    for roots, run, weights in [(self.pos_roots, self.RUN, pos_weights), (self.neg_roots, self.RUN_d, neg_weights)]:
+      for e, p in enumerate(roots):
+        if is_true(model.eval(run[p][1], model_completion=True)):
+          correct += weights[e]
+    return 1 - correct/(sum(pos_weights)+sum(neg_weights))
+
+"""
+Lays out the timesteps of traces as positions, see Variables. Returns the
+(e, t) each position is named after, its step, the position after it and
+the position of timestep 1 of each trace.
+"""
+def positions(traces, trie):
+  names = []
+  steps = []
+  next_positions = []
+  roots = []
+  if not trie:
+    for e, trace in enumerate(traces):
+      roots.append(len(names))
+      for t in range(1, len(trace)+1):
+        names.append((e, t))
+        steps.append(trace[t-1])
+        next_positions.append(len(names) if t < len(trace) else None)
+    return names, steps, next_positions, roots
+
+  # suffix trie, built from the last timestep back: a suffix is its first
+  # step and the position of the rest
+  suffixes = dict()
+  first_positions = [None]*len(traces)
+  for e, trace in enumerate(traces):
+    p = None
+    for t in range(len(trace), 0, -1):
+      key = (tuple(trace[t-1]), p)
+      if key not in suffixes:
+        suffixes[key] = len(names)
+        names.append((e, t))
+        steps.append(trace[t-1])
+        next_positions.append(p)
+      p = suffixes[key]
+    roots.append(p)
+  return names, steps, next_positions, roots
@@ -0,0 +1,98 @@
+import os
+import spot
+from functools import lru_cache
+from utils import accuracy
+
+"""
+Warm start of the SAT methods from the formulas NeuralLTLf extracted
+(extract_formulas.py writes the formula of the i-th dataset of size n on line
+i of {output_path}/{n}.txt, in Spot syntax). The extracted formula is turned
+into the shape of the SAT encodings: binary AND/OR, negation on literals only
+and true/false as (a | !a)/(a & !a), which gives its size in encoding nodes.
+"""
+
+spot_operators = {spot.op_And: "AND", spot.op_Or: "OR", spot.op_U: "UNTIL", spot.op_R: "RELEASE",
+                  spot.op_F: "EVENTUALLY", spot.op_G: "ALWAYS", spot.op_X: "NEXT"}
+
+"""
+Reads the extracted formulas of size n, one string per dataset (none if
+nothing was extracted for size n, e.g. n=1)
+"""
+@lru_cache(maxsize=None)
+def read_extracted(output_path, n):
+    if not os.path.exists(f"{output_path}/{n}.txt"):
+        return []
+    with open(f"{output_path}/{n}.txt") as file:
+        return [line.strip() for line in file if line.strip()]
+
+"""
+Converts a Spot formula in negative normal form into a tuple formula (see
+ltlf_eval.py) in the shape of the SAT encodings
+"""
+def from_spot(f, lits):
+    if f._is(spot.op_tt):
+        return ("OR", ("LIT", 0), ("NOT", ("LIT", 0)))
+    if f._is(spot.op_ff):
+        return ("AND", ("LIT", 0), ("NOT", ("LIT", 0)))
+    if f._is(spot.op_ap):
+        return ("LIT", lits.index(f.ap_name()))
+    if f._is(spot.op_Not):
+        return ("NOT", from_spot(f[0], lits))
+    op = spot_operators[f.kind()]
+    children = [from_spot(child, lits) for child in f]
+    if len(children) == 1:
+        return (op, children[0])
+    # n-ary AND/OR associate to the right
+    formula = children[-1]
+    for child in reversed(children[:-1]):
+        formula = (op, child, formula)
+    return formula
+
+def size(formula):
+    if formula[0] in ["LIT", "NOT"]:
+        return 1
+    return 1 + sum(size(f) for f in formula[1:])
+
+def uses_next(formula):
+    if formula[0] in ["LIT", "NOT"]:
+        return False
+    return formula[0] in ["NEXT", "WNEXT"] or any(uses_next(f) for f in formula[1:])
+
+class WarmStart:
+    """
+    The extracted formula of one dataset, its size in encoding nodes and its
+    accuracy on the dataset's traces
+    """
+    def __init__(self, formula_string, lits, pos_traces, neg_traces, pos_weights=None, neg_weights=None):
+        # without ->, <->, xor, W and M, which the encodings don't have
+        f = spot.unabbreviate(spot.formula(formula_string), "ie^MW")
+        self.formula = from_spot(f.negative_normal_form(), lits)
+        self.size = size(self.formula)
+        self.accuracy = accuracy(self.formula, len(lits), pos_traces, neg_traces, pos_weights, neg_weights)
+
+    def expressible(self, metric):
+        return metric or not uses_next(self.formula)
+
+    def structure(self, variables):
+        """
+        The literals that make nodes 1..size of the encoding (see variables.py)
+        the extracted formula, with its nodes numbered in pre-order
+        """
+        literals = []
+        def number(formula, s):
+            # returns the next free node
+            if formula[0] == "LIT":
+                literals.extend([variables.skel["LIT"][s], variables.L[s][formula[1]]])
+                return s + 1
+            if formula[0] == "NOT":
+                literals.extend([variables.skel["LIT"][s], variables.L_neg[s][formula[1][1]]])
+                return s + 1
+            literals.append(variables.skel[formula[0]][s])
+            literals.append(variables.A[s][s+1])
+            after = number(formula[1], s+1)
+            if len(formula) == 3:
+                literals.append(variables.B[s][after])
+                after = number(formula[2], after)
+            return after
+        number(self.formula, 1)
+        return literals
@@ -0,0 +1,201 @@
+import tensorflow as tf
+import numpy as np
+from LTLOperator import LTLOperator
+
+weight_names = ['w_prop', 'w_metric', 'init_metric', 'w_qual', 'bias', 'init_run']
+
+"""
+Initializes every model on the leading axis as if it were a separate
+LTLOperator weight, so fan in/out ignore the stacking axis
+"""
+def stacked_initializer(initializer):
+    def init(shape, dtype=None):
+        return tf.stack([initializer(shape[1:], dtype=dtype) for _ in range(shape[0])])
+    return init
+
+class StackedLTLOperator(tf.keras.layers.Layer):
+  """
+  num_models independent LTLOperators with their weights, slope and alpha
+  stacked on a leading axis
+  Input: (num_models, batch_size, trace_length, num_variables) tensor
+  Output: (num_models, batch_size, trace_length, num_filters) tensor
+  """
+  def __init__(self, num_models, num_variables, num_filters, metric=True, **kwargs):
+    self.num_models = num_models
+    self.num_variables = num_variables
+    self.num_filters = num_filters
+    self.metric = metric
+    self.slope = tf.Variable(tf.ones((num_models,)), trainable=False)
+    self.alpha = tf.Variable(0.2*tf.ones((num_models,)), trainable=False)
+    super(StackedLTLOperator, self).__init__(**kwargs)
+
+  def build(self, input_shape):
+    init = stacked_initializer(tf.keras.initializers.GlorotNormal())
+    m = self.num_models
+    self.w_prop = self.add_weight(name='w_prop',
+                                  shape=(m, self.num_variables, self.num_filters),
+                                  initializer=init, trainable=True)
+    if self.metric:
+        self.w_metric = self.add_weight(name='w_metric',
+                                        shape=(m, self.num_variables, self.num_filters),
+                                        initializer=init, trainable=True)
+        self.init_metric = self.add_weight(name='init_metric',
+                                           shape=(m, 1, self.num_variables),
+                                           initializer=init, trainable=True)
+    self.w_qual = self.add_weight(name='w_qual',
+                                  shape=(m, self.num_filters),
+                                  initializer=init, trainable=True)
+    self.bias = self.add_weight(name='bias',
+                                shape=(m, self.num_filters),
+                                initializer=tf.keras.initializers.Zeros(),
+                                trainable=True)
+    self.init_run = self.add_weight(name='init_run',
+                                    shape=(m, 1, self.num_filters),
+                                    initializer=init, trainable=True)
+    super(StackedLTLOperator, self).build(input_shape)
+
+  def activation(self, x, training):
+    if training:
+        return tf.nn.sigmoid(tf.reshape(self.slope, (-1, 1, 1))*x)
+    else:
+        return tf.clip_by_value(tf.sign(x), 0, 1)
+
+  def relu_scheduled(self, x, training):
+    if training:
+      return tf.maximum(tf.expand_dims(self.alpha, 1)*x, x)
+    else:
+      return tf.nn.relu(x)
+
+  def call(self, traces, training=False):
+    batch = tf.shape(traces)[1]
+    combined_out = tf.einsum('mbtv,mvf->mbtf', traces, self.w_prop)
+    if self.metric:
+        extension = tf.broadcast_to(tf.expand_dims(self.init_metric, 1),
+                                    tf.stack([self.num_models, batch, 1, self.num_variables]))
+        next_traces = tf.concat([traces[:, :, 1:, :], extension], axis=2)
+        combined_out += tf.einsum('mbtv,mvf->mbtf', next_traces, self.w_metric)
+    init_run_val = self.activation(tf.broadcast_to(self.init_run,
+                                                   tf.stack([self.num_models, batch, self.num_filters])),
+                                   training)
+    w_qual = tf.expand_dims(self.relu_scheduled(self.w_qual, training), 1)
+    bias = tf.expand_dims(self.bias, 1)
+
+    def step(next_run_val, curr_run_vals):
+      return self.activation(w_qual*next_run_val + curr_run_vals + bias, training)
+
+    # time-major reverse scan, as in LTLOperator.scan_time
+    results = tf.scan(step, tf.transpose(combined_out, perm=[2, 0, 1, 3]),
+                      initializer=init_run_val, reverse=True)
+    return tf.transpose(results, perm=[1, 2, 0, 3])
+
+class StackedModel(tf.keras.Model):
+  """
+  num_models copies of the network built by get_model, trained together.
+  Each copy keeps its own early stopping state (active) like DiscreteAcc and
+  its own annealing state like Anneal.
+  """
+  def __init__(self, get_model, num_models):
+    super(StackedModel, self).__init__()
+    self.get_model = get_model
+    self.num_models = num_models
+    template = get_model()
+    self.operators = [StackedLTLOperator(num_models, l.num_variables, l.num_filters, l.metric)
+                      for l in template.layers if isinstance(l, LTLOperator)]
+    self.active = tf.Variable(tf.ones((num_models,), dtype=tf.bool), trainable=False)
+
+  def call(self, traces, training=False):
+    """
+    Input: (num_models, batch_size, trace_length, num_variables) tensor
+    Output: (num_models, batch_size) tensor with the output at the first timestep
+    """
+    for l in self.operators:
+      traces = l(traces, training=training)
+    return traces[:, :, 0, 0]
+
+  def anneal(self):
+    active = tf.cast(self.active, tf.float32)
+    for l in self.operators:
+      l.slope.assign(l.slope + 0.01*active)
+      l.alpha.assign(tf.maximum(l.alpha - 7e-5*active, 0))
+
+  def discrete_acc(self, traces, labels):
+    output = self(traces, training=False)
+    return tf.reduce_mean(tf.cast(output == labels, tf.float32), axis=1)
+
+  def get_model_weights(self, m):
+    """
+    Returns the variables of model m as numpy arrays, one dict per layer
+    """
+    weights = []
+    for l in self.operators:
+      layer_weights = {name: getattr(l, name)[m].numpy() for name in weight_names if hasattr(l, name)}
+      layer_weights['slope'] = l.slope[m].numpy()
+      layer_weights['alpha'] = l.alpha[m].numpy()
+      weights.append(layer_weights)
+    return weights
+
+"""
+Copies weights taken with StackedModel.get_model_weights into a model from
+get_model and saves them as a regular checkpoint
+"""
+def save_model_weights(get_model, weights, checkpoint_path):
+    model = get_model()
+    layers = [l for l in model.layers if isinstance(l, LTLOperator)]
+    for l, layer_weights in zip(layers, weights):
+        for name, value in layer_weights.items():
+            getattr(l, name).assign(np.reshape(value, getattr(l, name).shape))
+    model.save_weights(checkpoint_path)
+
+"""
+Trains num_models copies of the network from get_model, copy m on
+traces[m] and labels[m], with the same optimizer, loss, annealing and
+early stopping as train_deepltl. Returns each copy's discretized accuracy
+and weights (taken when it stopped), and the number of epochs it trained.
+"""
+def train_stacked(get_model, traces, labels, epochs=3000, batch_size=100):
+    traces = tf.convert_to_tensor(traces, tf.float32)
+    labels = tf.convert_to_tensor(labels, tf.float32)
+    num_models, num_traces = labels.shape
+    model = StackedModel(get_model, num_models)
+    optimizer = tf.keras.optimizers.Adam(learning_rate=0.005)
+    num_batches = -(-num_traces // batch_size)
+
+    @tf.function
+    def train_epoch():
+        # each model shuffles its own data, as fit(shuffle=True) would
+        order = tf.argsort(tf.random.uniform((num_models, num_traces)), axis=1)
+        active = tf.cast(model.active, tf.float32)
+        for j in range(num_batches):
+            idx = order[:, j*batch_size:(j+1)*batch_size]
+            batch_traces = tf.gather(traces, idx, batch_dims=1)
+            batch_labels = tf.gather(labels, idx, batch_dims=1)
+            with tf.GradientTape() as tape:
+                output = model(batch_traces, training=True)
+                loss = tf.reduce_mean(tf.keras.backend.binary_crossentropy(batch_labels, output), axis=1)
+                # models are independent, so summing keeps their gradients separate
+                loss = tf.reduce_sum(active*loss)
+            grads = tape.gradient(loss, model.trainable_variables)
+            optimizer.apply_gradients(zip(grads, model.trainable_variables))
+
+    discrete_acc = tf.function(model.discrete_acc)
+    model(traces[:, :1], training=False)
+    weights = [None]*num_models
+    accs = np.zeros(num_models)
+    num_epochs = np.full(num_models, epochs)
+    for epoch in range(epochs):
+        train_epoch()
+        model.anneal()
+        accs_epoch = discrete_acc(traces, labels).numpy()
+        for m in np.nonzero(model.active.numpy() & (accs_epoch == 1.0))[0]:
+            weights[m] = model.get_model_weights(m)
+            accs[m] = 1.0
+            num_epochs[m] = epoch + 1
+        model.active.assign(model.active.numpy() & (accs_epoch < 1.0))
+        if not model.active.numpy().any():
+            break
+
+    for m in range(num_models):
+        if weights[m] is None:
+            weights[m] = model.get_model_weights(m)
+            accs[m] = accs_epoch[m]
+    return accs, weights, num_epochs
@@ -6,63 +6,146 @@ import pickle
 from LTLOperator import LTLOperator
 import os
 import argparse
-from models import get_model_zero, get_model_one, get_model_two
+from models import get_model_zero, get_model_one, get_model_two, collapse_stutter, length_batches, pad_traces
 from train_utils import DiscreteAcc, Anneal
+from stacked_training import train_stacked, save_model_weights
+from packed_data import dataset_exists, load_dataset
 
 batch_size = 100
 num_restarts = 2
+# epochs between discretized accuracy checks, each an extra forward pass
+check_freq = 10
 num_formulas = 50
 
+"""
+Returns the indices i of the first num_formulas datasets {data_path}/{n}/train-i.
+Some formulas may be skipped so read in as many files as it takes to get to
+num_formulas (up to 100)
+"""
+def formula_files(data_path, n):
+    files = []
+    for i in range(100):
+        if len(files) >= num_formulas:
+            break
+        if dataset_exists(data_path, n, i):
+            files.append(i)
+    return files
+
+"""
+Trains up to num_restarts models on one dataset and saves the best to
+checkpoint_path. Returns its discretized accuracy and the number of epochs
+each restart ran. With stutter="tail" (or "all") repeated last steps (or all
+repeated steps) are cut from the traces first (see models.collapse_stutter),
+and batches only run the timesteps their traces have left. check_freq and
+patience are passed on to DiscreteAcc.
+"""
+def train_formula(get_model, train_traces, train_labels, checkpoint_path, stutter=None, check_freq=check_freq, patience=None):
+    if stutter is not None:
+        collapsed = collapse_stutter(train_traces, stutter == "tail")
+        train_traces = pad_traces(collapsed)
+    best_acc = 0
+    epochs = []
+    for restart in range(num_restarts):
+        model = get_model(masked=stutter is not None)
+        model.compile(optimizer=tf.keras.optimizers.Adam(lr=0.005),
+                      loss='binary_crossentropy',
+                      metrics=['accuracy'])
+
+        callbacks = [Anneal(), DiscreteAcc(train_traces, train_labels, check_freq, patience)]
+        if stutter is None:
+            history = model.fit(train_traces, train_labels,
+                                epochs=3000, batch_size=batch_size,
+                                verbose=0,
+                                shuffle=True,
+                                callbacks=callbacks)
+        else:
+            history = model.fit(length_batches(collapsed, train_labels, batch_size),
+                                epochs=3000, verbose=0, callbacks=callbacks)
+        epochs.append(len(history.history['loss']))
+        output = model.predict(train_traces, batch_size=batch_size)
+        labels = np.asarray(train_labels)
+        acc = float(tf.reduce_mean(tf.cast(output.reshape(-1) == labels, tf.float32)))
+        if acc >= best_acc:
+            if stutter is not None:
+                # checkpoints keep the layout of the unmasked model that
+                # extract_formulas loads
+                unmasked = get_model()
+                unmasked.set_weights(model.get_weights())
+                unmasked.save_weights(checkpoint_path)
+            else:
+                model.save_weights(checkpoint_path)
+            best_acc = acc
+        if best_acc == 1.0:
+            break
+    return best_acc, epochs
+
 """
 Trains the DeepLTL models on data from data_path and
 saves checkpoints to train_path.
 """
-def train_models(models, data_path, train_path):
+def train_models(models, data_path, train_path, stutter=None, check_freq=check_freq, patience=None):
     for name, get_model in enumerate(models):
         for n in range(2, 16):
-            count = 0
-            # some formulas may be skipped so read in as many files
-            # as it takes to get to num_formulas (up to 100)
-            for i in range(100):
-                if count >= num_formulas:
-                    break
+            for count, i in enumerate(formula_files(data_path, n)):
                 checkpoint_path = f"{train_path}/{name}/{n}/cp-{i}.ckpt"
+                train_traces, train_labels = load_dataset(data_path, n, i)
 
-                if os.path.exists(f"{data_path}/{n}/train-{i}"):
-                    with open(f"{data_path}/{n}/train-{i}", "rb") as file:
-                      train_traces, train_labels = pickle.loads(file.read())
+                best_acc, _ = train_formula(get_model, train_traces, train_labels, checkpoint_path, stutter, check_freq, patience)
+                print(f"Trained formula size {n} number {count+1} with accuracy {best_acc}")
 
-                    best_acc = 0
-                    for restart in range(num_restarts):
-                        model = get_model()
-                        model.compile(optimizer=tf.keras.optimizers.Adam(lr=0.005),
-                                      loss='binary_crossentropy',
-                                      metrics=['accuracy'])
+                tf.keras.backend.clear_session()
 
-                        history = model.fit(train_traces, train_labels,
-                                            epochs=3000, batch_size=batch_size,
-                                            verbose=0,
-                                            shuffle=True,
-                                            callbacks=[Anneal(),
-                                                       DiscreteAcc(train_traces, train_labels)])
-                        output = model.predict(train_traces, batch_size=batch_size)
-                        labels = train_labels.numpy()
-                        acc = float(tf.reduce_mean(tf.cast(output.reshape(-1) == labels, tf.float32)))
-                        if acc >= best_acc:
-                            model.save_weights(checkpoint_path)
-                            best_acc = acc
-                        if best_acc == 1.0:
-                            break
-                    count += 1
+"""
+Same as train_models, but for each architecture and formula size trains all
+files and restarts together as one stacked model
+"""
+def train_models_stacked(models, data_path, train_path):
+    for name, get_model in enumerate(models):
+        for n in range(2, 16):
+            files = formula_files(data_path, n)
+            if len(files) == 0:
+                continue
 
-                    print(f"Trained formula size {n} number {count} with accuracy {best_acc}")
+            all_traces = []
+            all_labels = []
+            for i in files:
+                train_traces, train_labels = load_dataset(data_path, n, i)
+                all_traces += [train_traces]*num_restarts
+                all_labels += [train_labels]*num_restarts
+            accs, weights, _ = train_stacked(get_model, np.stack(all_traces), np.stack(all_labels),
+                                             epochs=3000, batch_size=batch_size)
 
-                tf.keras.backend.clear_session()
+            for count, i in enumerate(files):
+                # pick the restart train_models would have kept
+                best_acc = 0
+                for m in range(count*num_restarts, (count+1)*num_restarts):
+                    if accs[m] >= best_acc:
+                        best = m
+                        best_acc = accs[m]
+                    if best_acc == 1.0:
+                        break
+                save_model_weights(get_model, weights[best], f"{train_path}/{name}/{n}/cp-{i}.ckpt")
+                print(f"Trained formula size {n} number {count+1} with accuracy {best_acc}")
+
+            tf.keras.backend.clear_session()
 
 if __name__ == "__main__":
     models = [get_model_zero, get_model_one, get_model_two]
     parser = argparse.ArgumentParser(description="Inputs for DeepLTL training")
     parser.add_argument('--data_path',required=True,type=str,help="Path to traces")
     parser.add_argument('--train_path',required=True,type=str,help="Path to write model checkpoints to")
+    parser.add_argument('--stacked', default=False, action='store_true',
+                        help="Train all formulas of a size in one batched model")
+    parser.add_argument('--stutter', default=None, choices=["tail", "all"],
+                        help="Cut repeated last steps (tail) or all repeated steps from the traces")
+    parser.add_argument('--check_freq', default=check_freq, type=int,
+                        help="Epochs between discretized accuracy checks")
+    parser.add_argument('--patience', default=None, type=int,
+                        help="Checks without improvement before stopping early")
     args = parser.parse_args()
-    train_models(models, args.data_path, args.train_path)
+    if args.stacked:
+        if args.stutter is not None:
+            parser.error("--stutter is not supported with --stacked")
+        train_models_stacked(models, args.data_path, args.train_path)
+    else:
+        train_models(models, args.data_path, args.train_path, args.stutter, args.check_freq, args.patience)
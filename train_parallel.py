@@ -0,0 +1,96 @@
+import tensorflow as tf
+import multiprocessing
+import argparse
+import json
+import time
+import os
+from models import get_model_zero, get_model_one, get_model_two
+from train_deepltl import formula_files, train_formula, check_freq
+from packed_data import load_dataset
+
+models = [get_model_zero, get_model_one, get_model_two]
+
+num_threads = 1
+
+"""
+Pins the TensorFlow thread pools of a worker before it runs any op
+"""
+def init_worker(threads):
+    global num_threads
+    num_threads = threads
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+"""
+Trains one (model, n, i) job in a worker process and returns its manifest entry
+"""
+def run_job(job):
+    name, n, i, data_path, train_path, stutter, check_freq, patience = job
+    start_time = time.time()
+    train_traces, train_labels = load_dataset(data_path, n, i)
+    best_acc, epochs = train_formula(models[name], train_traces, train_labels,
+                                     f"{train_path}/{name}/{n}/cp-{i}.ckpt", stutter, check_freq, patience)
+    tf.keras.backend.clear_session()
+    return {"model": name, "n": n, "i": i, "accuracy": best_acc,
+            "wall_time": time.time() - start_time, "epochs": epochs,
+            "threads": num_threads}
+
+"""
+Reads the entries of jobs that already finished, keyed by (model, n, i)
+"""
+def read_manifest(manifest_path):
+    done = dict()
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            for line in file:
+                # a crash can leave a partially written last line
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[(entry["model"], entry["n"], entry["i"])] = entry
+    return done
+
+"""
+Trains every (model, n, i) of train_deepltl.train_models as a separate job on
+a pool of worker processes. Jobs whose checkpoint and accuracy were already
+recorded in {train_path}/manifest.jsonl are skipped, so an interrupted run can
+be restarted with the same arguments.
+"""
+def train_models_parallel(models, data_path, train_path, num_workers, threads, stutter=None, check_freq=check_freq, patience=None):
+    manifest_path = f"{train_path}/manifest.jsonl"
+    os.makedirs(train_path, exist_ok=True)
+    done = read_manifest(manifest_path)
+
+    jobs = []
+    for name in range(len(models)):
+        for n in range(2, 16):
+            for i in formula_files(data_path, n):
+                if (name, n, i) in done and os.path.exists(f"{train_path}/{name}/{n}/cp-{i}.ckpt.index"):
+                    continue
+                jobs.append((name, n, i, data_path, train_path, stutter, check_freq, patience))
+    print(f"{len(jobs)} jobs to run, {len(done)} already in manifest")
+
+    start_time = time.time()
+    # spawn so every worker starts its own TensorFlow runtime with the thread settings
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(num_workers, initializer=init_worker, initargs=(threads,)) as pool:
+        for count, entry in enumerate(pool.imap_unordered(run_job, jobs)):
+            # only the parent writes the manifest, one line per finished job
+            with open(manifest_path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+            print(f"[{count+1}/{len(jobs)} {time.time()-start_time:.0f}s] "
+                  f"Trained model {entry['model']} formula size {entry['n']} number {entry['i']} "
+                  f"with accuracy {entry['accuracy']} in {entry['wall_time']:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inputs for parallel DeepLTL training")
+    parser.add_argument('--data_path',required=True,type=str,help="Path to traces")
+    parser.add_argument('--train_path',required=True,type=str,help="Path to write model checkpoints to")
+    parser.add_argument('--num_workers',default=os.cpu_count(),type=int,help="Number of worker processes")
+    parser.add_argument('--threads',default=1,type=int,help="TensorFlow intra/inter-op threads per worker")
+    parser.add_argument('--stutter',default=None,choices=["tail", "all"],help="Cut repeated last steps (tail) or all repeated steps from the traces")
+    parser.add_argument('--check_freq',default=check_freq,type=int,help="Epochs between discretized accuracy checks")
+    parser.add_argument('--patience',default=None,type=int,help="Checks without improvement before stopping early")
+    args = parser.parse_args()
+    train_models_parallel(models, args.data_path, args.train_path, args.num_workers, args.threads, args.stutter, args.check_freq, args.patience)
@@ -21,16 +21,48 @@ class Anneal(tf.keras.callbacks.Callback):
 
 class DiscreteAcc(tf.keras.callbacks.Callback):
     """
-    Callback that checks discretized accuracy
+    Callback that checks discretized accuracy every check_freq epochs and stops
+    training at zero loss, or after patience checks without improvement.
+    For models.LTLModel the accuracy is the in-graph discrete_acc metric and the
+    training set is only predicted once to confirm a candidate 1.0, otherwise
+    the training set is predicted at every check.
     """
-    def __init__(self, train_traces, train_labels):
+    def __init__(self, train_traces, train_labels, check_freq=1, patience=None):
         self.train_traces = train_traces
-        self.train_labels = train_labels
+        self.train_labels = np.asarray(train_labels)
+        self.check_freq = check_freq
+        self.patience = patience
+        self.best = -1.0
+        self.wait = 0
 
-    def on_epoch_end(self, epoch, logs=None):
+    def predict_acc(self):
         output = self.model.predict(self.train_traces, batch_size=batch_size)
         output = output.reshape(-1)
-        labels = self.train_labels.numpy()
-        metrics = float(tf.reduce_mean(tf.cast(output == labels, tf.float32)))
+        return float(np.mean(output == self.train_labels))
+
+    def is_check_epoch(self, epoch):
+        return (epoch + 1) % self.check_freq == 0
+
+    def on_epoch_begin(self, epoch, logs=None):
+        if hasattr(self.model, 'check_discrete'):
+            self.model.check_discrete.assign(self.is_check_epoch(epoch))
+
+    def on_epoch_end(self, epoch, logs=None):
+        if not self.is_check_epoch(epoch):
+            return
+        if hasattr(self.model, 'check_discrete'):
+            # the metric is averaged over batches while the weights change
+            metrics = float(logs['discrete_acc'])
+            if metrics == 1.0:
+                metrics = self.predict_acc()
+        else:
+            metrics = self.predict_acc()
         if metrics == 1.0:
             self.model.stop_training = True
+        if metrics > self.best:
+            self.best = metrics
+            self.wait = 0
+        else:
+            self.wait += 1
+            if self.patience is not None and self.wait >= self.patience:
+                self.model.stop_training = True
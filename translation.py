@@ -1,5 +1,5 @@
 import numpy as np
-from itertools import product
+from functools import lru_cache
 from pyeda.inter import *
 from pyeda.boolalg.expr import Variable, OrOp, AndOp, Complement, _Zero, _One
 import spot
@@ -7,6 +7,26 @@ import spot
 def len_form(f):
     return spot.length(spot.formula(f)) - f.count("!")
 
+# minimized truth tables kept across filters, layers and checkpoints
+CACHE_SIZE = 4096
+
+"""
+All assignments to num_inputs inputs in ascending order, the first column
+the most significant bit
+"""
+def truth_table_inputs(num_inputs):
+    rows = np.arange(2**num_inputs)[:, np.newaxis]
+    return (rows >> np.arange(num_inputs-1, -1, -1)) & 1
+
+"""
+Minimizes the truth table over ttvars('x', num_inputs) whose outputs are the
+bytes of np.packbits, so equal tables are minimized once
+"""
+@lru_cache(maxsize=CACHE_SIZE)
+def minimize(num_inputs, outputs):
+    bits = np.unpackbits(np.frombuffer(outputs, dtype=np.uint8))[:2**num_inputs]
+    return espresso_tts(truthtable(ttvars('x', num_inputs), bits.tolist()))[0]
+
 def translate_layer(layer, metric=False):
     w_prop = layer[0]
     if metric:
@@ -25,29 +45,25 @@ def translate_layer(layer, metric=False):
 
     if metric:
         w_augment = np.concatenate([w_prop, w_metric, np.expand_dims(w_qual, 0)], axis=0)
-        ttable_temp_var = ttvars('x', 2*num_var)
-        ttable_nontemp_var = ttvars('x', 2*num_var)
-        ttable = np.flip(np.array(list(product([1, 0], repeat=2*num_var+1))), axis=0)
+        num_inputs = 2*num_var
     else:
         w_augment = np.concatenate([w_prop, np.expand_dims(w_qual, 0)], axis=0)
-        ttable_temp_var = ttvars('x', num_var)
-        ttable_nontemp_var = ttvars('x', num_var)
-        ttable = np.flip(np.array(list(product([1, 0], repeat=num_var+1))), axis=0)
+        num_inputs = num_var
+    ttable = truth_table_inputs(num_inputs+1)
 
     formulas = []
-    output = np.matmul(ttable, w_augment) + bias
+    output = np.matmul(ttable, w_augment) + bias > 0
+    # the last input (the run of the filter) is the least significant bit
+    output_temp = output[1::2]
+    output_nontemp = output[0::2]
 
     for f in range(num_filters):
-        ttable_temp = truthtable(ttable_temp_var,
-                                 np.transpose(output[np.nonzero(ttable[:, -1]), f]) > 0)
-        ttable_nontemp = truthtable(ttable_nontemp_var,
-                                    np.transpose(output[np.nonzero(-1 * (ttable[:, -1] - 1)), f]) > 0)
-        f_temp = espresso_tts(ttable_temp)
-        f_nontemp = espresso_tts(ttable_nontemp)
+        f_temp = minimize(num_inputs, np.packbits(output_temp[:, f]).tobytes())
+        f_nontemp = minimize(num_inputs, np.packbits(output_nontemp[:, f]).tobytes())
         if metric:
-            formulas.append((f_temp[0], f_nontemp[0], num_var, init_metric[0], init_run[0][f]))
+            formulas.append((f_temp, f_nontemp, num_var, init_metric[0], init_run[0][f]))
         else:
-            formulas.append((f_temp[0], f_nontemp[0], num_var, init_run[0][f]))
+            formulas.append((f_temp, f_nontemp, num_var, init_run[0][f]))
     return formulas
 
 """